@@ -0,0 +1,46 @@
+'''Import time of the packages, measured with ``python -X importtime`` in
+fresh interpreters. Plotting, elephant, numba and h5py must only be imported
+on first use, the benchmark exits with an error if a plain import pulls them
+beyond what ``import brian2`` already loads (brian2 imports matplotlib).
+
+Run from the repository root with ``python -m benchmarks.bench_import``.
+'''
+import subprocess
+import sys
+
+MODULES = ['utils', 'topology.layers', 'topology.connections', 'topology.net']
+LAZY = ['matplotlib', 'seaborn', 'elephant', 'quantities', 'numba', 'h5py', 'scipy.signal']
+
+
+def import_times(module):
+    '''Returns {imported module : cumulative import time in us} of a fresh
+    ``import module``.'''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    
+    repeat = 3
+    baseline = [import_times('brian2') for _ in range(repeat)]
+    baseline_time = min(times['brian2'] for times in baseline)
+    print('{:22s} : {:8.1f} ms'.format('brian2 (baseline)', baseline_time / 1e3))
+    regressions = []
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(repeat)]
+        best = min(times[module] for times in runs)
+        loaded = [name for name in LAZY if name in runs[0] and name not in baseline[0]]
+        print('{:22s} : {:8.1f} ms (+{:6.1f} ms){}'.format(module, best / 1e3, (best - baseline_time) / 1e3,
+              ', imports ' + ', '.join(loaded) if loaded else ''))
+        regressions += [(module, name) for name in loaded]
+    
+    if regressions:
+        sys.exit('Eagerly imported : ' + ', '.join('{} by {}'.format(name, module)
+                                                 for module, name in regressions))
@@ -0,0 +1,57 @@
+'''Speed and spike timing accuracy of integration methods and time steps,
+compared to a fine dt Euler reference.
+
+Run from the repository root with ``python -m benchmarks.bench_integration``.
+'''
+import numpy as np
+import brian2 as b2
+from .common import synthetic_events, build_network, best_time
+
+REFERENCE = ('euler', 0.01 * b2.ms)
+SETTINGS = [('euler', 0.1 * b2.ms), ('exponential_euler', 0.1 * b2.ms),
+            ('euler', 0.5 * b2.ms), ('exponential_euler', 0.5 * b2.ms),
+            ('exponential_euler', 1 * b2.ms)]
+
+
+def run(method, dt, events, sim_duration, n_hidden):
+    '''Returns the hidden layer spikes (i, t in ms) and the best run time.'''
+    net = build_network(n_hidden=n_hidden, method=method, dt=dt)
+    net.store()
+    
+    def simulate():
+        net.restore()
+        net.run_samples([events[0][:2]], sim_duration)
+    
+    elapsed = best_time(simulate)
+    monitor = net.monitors['hidden_layer'][1]
+    return np.asarray(monitor.i[:]), np.asarray(monitor.t / b2.ms), elapsed
+
+
+def coincidence(reference, spikes, window):
+    '''Fraction of reference spikes matched by a spike of the same neuron
+    within window ms.'''
+    (ref_i, ref_t), (i, t) = reference, spikes
+    if len(ref_t) == 0 or len(t) == 0:
+        return float(len(ref_t) == len(t))
+    # Neurons are laid out on disjoint time ranges to search all spikes at once
+    span = max(ref_t.max(), t.max()) + 2 * window
+    ref_key, key = ref_t + ref_i * span, np.sort(t + i * span)
+    pos = np.searchsorted(key, ref_key)
+    nearest = np.minimum(np.abs(ref_key - key[np.clip(pos - 1, 0, len(key) - 1)]),
+                         np.abs(ref_key - key[np.clip(pos, 0, len(key) - 1)]))
+    return float(np.mean(nearest <= window))
+
+
+if __name__ == "__main__":
+    
+    n_hidden = 100
+    sim_duration = 1000 * b2.ms
+    events = synthetic_events(1, n_bins=1000, rate=0.05)
+    
+    ref_i, ref_t, ref_time = run(*REFERENCE, events, sim_duration, n_hidden)
+    print('reference {} dt = {} : {:8.3f} s, {} spikes'.format(*REFERENCE, ref_time, len(ref_t)))
+    for method, dt in SETTINGS:
+        i, t, elapsed = run(method, dt, events, sim_duration, n_hidden)
+        print('{:18s} dt = {:6s} : {:8.3f} s ({:5.1f}x), spikes {:+6.1%}, coincidence 1 ms {:6.1%}'.format(
+            method, str(dt), elapsed, ref_time / elapsed, len(t) / max(len(ref_t), 1) - 1,
+            coincidence((ref_i, ref_t), (i, t), window=1.)))
@@ -0,0 +1,29 @@
+'''Samples/sec of SNN.run_samples with and without time-multiplexed packing.
+
+Run from the repository root with ``python -m benchmarks.bench_packing``.
+'''
+import brian2 as b2
+from .common import synthetic_events, build_network, best_time
+
+
+def run_dataset(net, events, sim_duration, pack, rest):
+    for first in range(0, len(events), pack):
+        batch = range(first, min(first + pack, len(events)))
+        net.run_samples([events[k][:2] for k in batch], sim_duration, rest)
+        net.restore()
+
+
+if __name__ == "__main__":
+    
+    n_samples = 64
+    sim_duration = 50 * b2.ms
+    rest = 20 * b2.ms
+    events = synthetic_events(n_samples, n_bins=50)
+    
+    # pack = 1 without rest is the one run per sample loop of SNN.train
+    for pack, gap in [(1, 0 * b2.ms), (4, rest), (16, rest), (64, rest)]:
+        net = build_network(n_bins=50)
+        net.store()
+        run_dataset(net, events, sim_duration, pack, gap)
+        elapsed = best_time(lambda: run_dataset(net, events, sim_duration, pack, gap))
+        print('pack = {:3d} : {:8.1f} samples/sec'.format(pack, n_samples / elapsed))
@@ -0,0 +1,34 @@
+'''Time of SNN.reset_state compared to store/restore between samples.
+
+Run from the repository root with ``python -m benchmarks.bench_reset``.
+'''
+import brian2 as b2
+from .common import synthetic_events, build_network, best_time
+
+
+def run_dataset(net, events, sim_duration, reset):
+    for k in range(len(events)):
+        net.run_samples([events[k][:2]], sim_duration)
+        reset()
+
+
+if __name__ == "__main__":
+    
+    n_samples = 32
+    sim_duration = 50 * b2.ms
+    events = synthetic_events(n_samples, n_bins=50)
+    
+    for n_hidden in [100, 1000]:
+        net = build_network(n_hidden=n_hidden, n_bins=50)
+        net.store()
+        net.run_samples([events[0][:2]], sim_duration)
+        
+        restore = best_time(net.restore, repeat=20)
+        reset = best_time(net.reset_state, repeat=20)
+        print('{:5d} neurons : restore {:8.3f} ms, reset_state {:8.3f} ms'.format(
+            n_hidden, restore * 1e3, reset * 1e3))
+        
+        for name, method in [('restore', net.restore), ('reset_state', net.reset_state)]:
+            run_dataset(net, events, sim_duration, method)
+            elapsed = best_time(lambda: run_dataset(net, events, sim_duration, method))
+            print('    {:12s} : {:8.1f} samples/sec'.format(name, n_samples / elapsed))
@@ -0,0 +1,40 @@
+import time
+import numpy as np
+from topology.net import SNN
+from topology.monitors import RecordingPolicy
+from topology.layers import ManualSpikeInput, Diehl_and_Cook_LIF
+from topology.connections import Diehl_and_Cook_STDP
+from utils import SpikeEventCache
+
+
+def synthetic_events(n_samples, n_bins = 300, n_class = 2, rate = 0.1, seed = 0):
+    '''Random single channel spike trains with random labels.'''
+    rng = np.random.default_rng(seed)
+    x = (rng.random((n_samples, n_bins)) < rate).astype(np.int8)
+    y = rng.integers(0, n_class, n_samples)
+    return SpikeEventCache.from_arrays(x, y)
+
+
+def build_network(n_hidden = 100, n_bins = 300, seed = 0, method = 'euler', dt = None):
+    '''Single input neuron fully connected to a Diehl and Cook layer, as in example.py.
+    Both layers are integrated with method at time step dt, hidden spike
+    times are recorded for packing.'''
+    rng = np.random.default_rng(seed)
+    weights = rng.random((1, n_hidden)) * 0.3 + 0.01
+    input_layer = ManualSpikeInput(np.zeros(n_bins), dt=1, n_neurons=1, name='input_spikes', clock_dt=dt)
+    hidden_layer = Diehl_and_Cook_LIF(n_neurons=n_hidden, name='hidden_layer', method=method, dt=dt)
+    net = SNN(name='benchmark')
+    net.add_layer(input_layer)
+    net.add_layer(hidden_layer, RecordingPolicy.spikes_only())
+    net.add_connection(Diehl_and_Cook_STDP(input_layer, hidden_layer, weights, name='ee_input'))
+    return net
+
+
+def best_time(func, repeat = 3):
+    '''Best wall clock time of several calls to func, in seconds.'''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
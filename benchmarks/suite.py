@@ -0,0 +1,166 @@
+'''Benchmark suite of layers, connections, encoder and training throughput.
+
+Every case is timed (best of several runs after a warm-up run, so that
+brian2 code generation is excluded) and its peak memory is measured with
+tracemalloc on a separate run. Results are appended as JSON lines so that
+they can be tracked over time.
+
+Run from the repository root with
+``python -m benchmarks.suite [--only layers] [--output results.jsonl]``.
+'''
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import brian2 as b2
+from topology.monitors import RecordingPolicy
+from topology.layers import LIF, Izhikevich, Diehl_and_Cook_LIF, CurrentBasedLIF, PoissonInput, BSAEncoder
+from topology.connections import ForwardConnection, STDPConnection, DA_STDP, Diehl_and_Cook_STDP
+from .common import synthetic_events, build_network, best_time
+
+CASES = []
+
+
+def case(group, **grid):
+    '''Register a setup function for every combination of the grid values.
+    The setup returns the function to time and the number of items it
+    processes, used to report a throughput.'''
+    def register(setup):
+        for values in itertools.product(*grid.values()):
+            CASES.append((group, setup, dict(zip(grid, values))))
+        return setup
+    return register
+
+
+def _network(*objects):
+    net = b2.Network()
+    net.add(*objects)
+    return net
+
+
+@case('layers', layer = ['LIF', 'Izhikevich', 'Izhikevich_mixed', 'Diehl_and_Cook_LIF', 'CurrentBasedLIF'],
+      n_neurons = [100, 1000, 10000])
+def layer_run(layer, n_neurons):
+    duration = 100 * b2.ms
+    layer = {
+        'LIF' : lambda: LIF(n_neurons = n_neurons, name = 'layer'),
+        'Izhikevich' : lambda: Izhikevich(name = 'layer', n_neurons = n_neurons),
+        'Izhikevich_mixed' : lambda: Izhikevich(name = 'layer', n_neurons = n_neurons,
+                                                model_type = {'RS' : 0.8, 'FS' : 0.1, 'LTS' : 0.1}),
+        'Diehl_and_Cook_LIF' : lambda: Diehl_and_Cook_LIF(n_neurons = n_neurons, name = 'layer'),
+        'CurrentBasedLIF' : lambda: CurrentBasedLIF(np.full(200, 1e-9) * b2.amp,
+                                                    n_neurons = n_neurons, name = 'layer')
+    }[layer]()
+    net = _network(layer.neurons)
+    return lambda: net.run(duration), int(duration / b2.defaultclock.dt)
+
+
+@case('connections', connection = ['ForwardConnection', 'STDPConnection', 'DA_STDP', 'Diehl_and_Cook_STDP'],
+      density = [0.01, 0.1, 1.0])
+def connection_run(connection, density, n_pre = 200, n_post = 200):
+    duration = 100 * b2.ms
+    source = PoissonInput(n_neurons = n_pre, name = 'source', freq = 20)
+    target = LIF(n_neurons = n_post, name = 'target')
+    weights = np.random.default_rng(0).random((n_pre, n_post)) * 0.3
+    conn = {
+        'ForwardConnection' : lambda: ForwardConnection(source, target, 'conn', connect_prob = density, seed = 0),
+        'STDPConnection' : lambda: STDPConnection(source, target, weights, 'conn', connect_prob = density, seed = 0),
+        'DA_STDP' : lambda: DA_STDP(source, target, 'conn', weights, density, seed = 0),
+        'Diehl_and_Cook_STDP' : lambda: Diehl_and_Cook_STDP(source, target, weights, 'conn',
+                                                            connect_prob = density, seed = 0)
+    }[connection]()
+    net = _network(source.neurons, target.neurons, conn.synapses)
+    return lambda: net.run(duration), len(conn.synapses)
+
+
+@case('monitors', monitor = ['StateMonitor', 'StateMonitor_strided', 'RingStateMonitor'],
+      n_neurons = [100, 1000])
+def monitor_run(monitor, n_neurons, window = 100):
+    duration = 1000 * b2.ms
+    layer = LIF(n_neurons = n_neurons, name = 'layer')
+    policy = {
+        'StateMonitor' : RecordingPolicy(),
+        'StateMonitor_strided' : RecordingPolicy(dt = 1 * b2.ms),
+        'RingStateMonitor' : RecordingPolicy(window = window)
+    }[monitor]
+    net = _network(layer.neurons, policy.state_monitor(layer.neurons, ['v']))
+    return lambda: net.run(duration), int(duration / b2.defaultclock.dt)
+
+
+@case('encoder', method = ['encode', 'encode_many'], n_samples = [10 ** 4, 10 ** 5, 10 ** 6])
+def encoder_run(method, n_samples, n_signals = 16):
+    encoder = BSAEncoder()
+    rng = np.random.default_rng(0)
+    if method == 'encode':
+        signal = rng.random(n_samples)
+        return lambda: encoder.encode(signal), n_samples
+    signals = rng.random((n_signals, n_samples // n_signals))
+    return lambda: encoder.encode_many(signals), n_samples
+
+
+@case('training', n_hidden = [100, 1000], pack = [1, 16])
+def training_run(n_hidden, pack, n_samples = 64):
+    events = synthetic_events(n_samples, n_bins = 100)
+    net = build_network(n_hidden = n_hidden, n_bins = 100)
+    
+    def train():
+        with contextlib.redirect_stdout(io.StringIO()):
+            net.train(events, 100 * b2.ms, pack = pack, rest = 20 * b2.ms if pack > 1 else 0 * b2.ms)
+    return train, n_samples
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(group, setup, params, repeat):
+    func, items = setup(**params)
+    func()
+    elapsed = best_time(func, repeat)
+    return {
+        'group' : group,
+        'case' : setup.__name__,
+        'params' : params,
+        'time_s' : elapsed,
+        'items_per_s' : items / elapsed,
+        'peak_memory_bytes' : peak_memory(func)
+    }
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text = True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--only', nargs = '*', help = 'groups to run, all by default')
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--output', default = 'benchmark_results.jsonl')
+    args = parser.parse_args()
+    
+    context = {'commit' : _commit(), 'timestamp' : time.time(),
+               'python' : platform.python_version(), 'brian2' : b2.__version__}
+    with open(args.output, 'a') as f:
+        for group, setup, params in CASES:
+            if args.only and group not in args.only:
+                continue
+            result = dict(context, **run_case(group, setup, params, args.repeat))
+            f.write(json.dumps(result) + '\n')
+            print('{:12s} {:20s} {} : {:.4f} s, {:.0f} items/s, {:.1f} MB'.format(
+                group, setup.__name__, params, result['time_s'], result['items_per_s'],
+                result['peak_memory_bytes'] / 2 ** 20))
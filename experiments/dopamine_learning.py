@@ -1,12 +1,11 @@
 from topology.net import SNN
 import numpy as np
 import brian2 as b2
-import random, torch
+import random
 import matplotlib.pyplot as plt
 from utils import *
 from topology.connections import ForwardConnection, Diehl_and_Cook_STDP, STDPConnection
 from topology.layers import ManualSpikeInput, LIF, Diehl_and_Cook_LIF, Izhikevich
-import h5py
 
 if __name__ == "__main__":
     
@@ -19,9 +18,7 @@ if __name__ == "__main__":
     spike_train = np.random.choice([0, 1], size=(300, ), p=[1./3, 2./3])
 
     print('\nLoading dataset from : {}\n'.format(dataset_path))
-    f = h5py.File(dataset_path, 'r')
-    x, y = torch.Tensor(f['x'][:]), torch.Tensor(f['y'][:])
-    dataset = torch.utils.data.TensorDataset(x, y)
+    dataset = H5SpikeDataset(dataset_path)
     
     input_layer = ManualSpikeInput(spike_train, dt=1, n_neurons=1, name='input_spikes')
     hidden_layer = LIF(n_neurons = 12, name = 'hidden_lif_layer')
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+import numpy as np
+import brian2 as b2
+from topology.connections import DA_STDP, Diehl_and_Cook_STDP
+from topology.layers import ManualSpikeInput, LIF
+
+PRE_SPIKES      = ([0, 1, 0, 0, 1], [10, 30, 60, 130, 150] * b2.ms)
+POST_SPIKES     = ([0, 1, 0, 1], [15, 25, 140, 155] * b2.ms)
+DURATION        = 200 * b2.ms
+
+# Clock-driven model DA_STDP replaced, integrated at every time step
+CLOCK_DRIVEN_MODEL = '''
+    mode : 1
+    dc/dt = -c / tauc : 1 (clock-driven)
+    dd/dt = -d / taud : 1 (clock-driven)
+    ds/dt = mode * c * d / taus : 1 (clock-driven)
+    dApre/dt = -Apre / taupre : 1 (event-driven)
+    dApost/dt = -Apost / taupost : 1 (event-driven)
+'''
+CLOCK_DRIVEN_PRE = '''
+    ge_post += s
+    Apre += dApre
+    c = clip(c + mode * Apost, -gmax, gmax)
+    s = clip(s + (1-mode) * Apost, -gmax, gmax)
+'''
+CLOCK_DRIVEN_POST = '''
+    Apost += dApost
+    c = clip(c + mode * Apre, -gmax, gmax)
+    s = clip(s + (1-mode) * Apre, -gmax, gmax)
+'''
+
+
+def replayed_layers(dt):
+    '''Two pre-synaptic and two post-synaptic neurons spiking at PRE_SPIKES
+    and POST_SPIKES.'''
+    pre = b2.SpikeGeneratorGroup(2, *PRE_SPIKES, dt=dt)
+    post_spikes = np.zeros((int(round(DURATION / dt)), 2))
+    post_spikes[np.round(POST_SPIKES[1] / dt).astype(int), POST_SPIKES[0]] = 1
+    post = b2.NeuronGroup(2, 'ge : 1', threshold='post_spikes(t, i) > 0', dt=dt,
+                          namespace={'post_spikes' : b2.TimedArray(post_spikes, dt=dt)})
+    return SimpleNamespace(neurons=pre, replicas=1), SimpleNamespace(neurons=post, replicas=1)
+
+
+def test_da_stdp_matches_clock_driven_model():
+    source, target = replayed_layers(b2.defaultclock.dt)
+    conn = DA_STDP(source, target, 'da', None, None)
+    net = b2.Network(source.neurons, target.neurons, conn.synapses)
+
+    dt = 0.01 * b2.ms
+    ref_source, ref_target = replayed_layers(dt)
+    ref = b2.Synapses(ref_source.neurons, ref_target.neurons, CLOCK_DRIVEN_MODEL,
+                      on_pre=CLOCK_DRIVEN_PRE, on_post=CLOCK_DRIVEN_POST, method='euler',
+                      dt=dt, namespace=dict(conn.parameters))
+    ref.connect(i=conn.synapses.i[:], j=conn.synapses.j[:])
+    ref.mode, ref.s, ref.c, ref.d = 1, 1e-10, 1e-10, 0
+    ref_net = b2.Network(ref_source.neurons, ref_target.neurons, ref)
+
+    rewards = np.array([0.5, 0.2])
+    for _ in range(2):
+        net.run(DURATION / 2)
+        ref_net.run(DURATION / 2)
+        # Rewards bring every synapse of the event-driven model up to date
+        conn.deliver_reward(rewards)
+        ref.d_[:] = ref.d_[:] + rewards[ref.j[:]]
+
+    assert np.any(np.abs(conn.synapses.s_[:]) > 1e-6)
+    for var in ['s', 'c', 'd']:
+        assert np.allclose(getattr(conn.synapses, var + '_')[:], getattr(ref, var + '_')[:],
+                           rtol=1e-3, atol=1e-6)
+
+
+def test_weights_larger_than_layers_are_cropped():
+    # example.py gives a (1, 100) weight matrix to a 12 neuron layer
+    weights = np.random.default_rng(0).random((1, 100))
+    input_layer = ManualSpikeInput(np.zeros(10), dt=1, n_neurons=1, name='input_spikes')
+    hidden_layer = LIF(n_neurons=12, name='hidden_lif_layer')
+    conn = Diehl_and_Cook_STDP(input_layer, hidden_layer, weights, name='ee_input')
+    assert np.array_equal(conn.synapses.w_[:], weights[0, :12])
+
+
+def test_connection_without_synapses():
+    input_layer = ManualSpikeInput(np.zeros(10), dt=1, n_neurons=1, name='input_spikes')
+    hidden_layer = LIF(n_neurons=12, name='hidden_lif_layer')
+    conn = DA_STDP(input_layer, hidden_layer, 'da', None, connect_prob=0)
+    assert len(conn.synapses) == 0
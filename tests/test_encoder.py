@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from topology.layers.encoder import BSAEncoder
+
+
+@pytest.mark.parametrize('step', [1, 7, 52, 100])
+@pytest.mark.parametrize('chunk_size', [1, 40, 97, 1000])
+def test_stream_matches_one_shot_encode(step, chunk_size):
+    time = np.arange(1000)
+    signal = 1 + np.sin(time / 30.) + 0.5 * np.sin(time / 7.)
+    gaussian = np.exp(-0.5 * ((np.arange(51) - 25) / 7.) ** 2)
+    encoder = BSAEncoder(filter_response=gaussian, step=step, threshold=0.5)
+    expected = encoder.encode(signal)
+    assert expected.sum() > 1
+    
+    stream = [encoder.encode_chunk(signal[k:k + chunk_size]) for k in range(0, len(signal), chunk_size)]
+    stream.append(encoder.flush_stream())
+    assert np.array_equal(np.concatenate(stream), expected)
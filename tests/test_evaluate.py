@@ -0,0 +1,56 @@
+import numpy as np
+import brian2 as b2
+from topology.net import SNN
+from topology.layers import ManualSpikeInput, LIF
+from topology.connections import Diehl_and_Cook_STDP
+from test_train import random_events
+
+
+def spiking_spec(n_hidden = 12, seed = 0, connect_prob = None):
+    '''Spec of the example.py topology, whose LIF layer draws random initial
+    membrane potentials.'''
+    weights = (np.random.default_rng(seed).random((1, n_hidden)) + 0.01) * 0.3
+    return {'name' : 'test',
+            'layers' : [(ManualSpikeInput, dict(spike_trains=np.zeros(300), dt=1, n_neurons=1,
+                                                name='input_spikes')),
+                        (LIF, dict(n_neurons=n_hidden, name='hidden_lif_layer'))],
+            'connections' : [(Diehl_and_Cook_STDP, dict(source='input_spikes', target='hidden_lif_layer',
+                                                        weights=weights, name='ee_input',
+                                                        connect_prob=connect_prob))]}
+
+
+def test_parallel_evaluate_matches_serial():
+    events = random_events(8)
+    net = SNN.from_spec(spiking_spec())
+    serial = net.evaluate(events, 300 * b2.ms)
+    assert serial.sum() > 0
+    assert np.array_equal(serial, net.evaluate(events, 300 * b2.ms, workers=2))
+
+
+def test_batched_evaluate_matches_serial():
+    events = random_events(8)
+    net = SNN.from_spec(spiking_spec())
+    serial = net.evaluate(events, 300 * b2.ms)
+    assert serial.sum() > 0
+    assert np.array_equal(serial, net.evaluate(events, 300 * b2.ms, batch_size=4))
+
+
+def test_random_connectivity_is_shipped_to_workers():
+    # Without a seed, every rebuilt network would draw other synapses
+    events = random_events(8)
+    net = SNN.from_spec(spiking_spec(connect_prob=0.5))
+    serial = net.evaluate(events, 300 * b2.ms)
+    assert np.array_equal(serial, net.evaluate(events, 300 * b2.ms, workers=2))
+    assert np.array_equal(serial, net.evaluate(events, 300 * b2.ms, batch_size=4))
+
+
+def test_evaluate_keeps_caller_state_and_snapshot():
+    net = SNN.from_spec(spiking_spec())
+    hidden = net.layers['hidden_lif_layer'].neurons
+    net.store()
+    stored = hidden.v_[:].copy()
+    hidden.v_ = stored + 1e-3
+    net.evaluate(random_events(2), 300 * b2.ms)
+    assert np.array_equal(hidden.v_[:], stored + 1e-3)
+    net.restore()
+    assert np.array_equal(hidden.v_[:], stored)
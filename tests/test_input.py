@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from utils.input import SpikeEventCache, spike_train_to_times
+
+
+def test_empty_dataset_gives_empty_cache():
+    cache = SpikeEventCache.from_dataset([])
+    assert len(cache) == 0
+    assert list(cache.offsets) == [0]
+    assert len(cache.indices) == len(cache.times) == len(cache.labels) == 0
+
+
+def test_from_dataset_matches_from_arrays():
+    rng = np.random.default_rng(0)
+    x = (rng.random((4, 2, 50)) < 0.1).astype(int)
+    y = np.arange(4)
+    cache = SpikeEventCache.from_dataset(list(zip(x, y)))
+    expected = SpikeEventCache.from_arrays(x, y)
+    assert np.array_equal(cache.offsets, expected.offsets)
+    for k in range(len(x)):
+        assert sorted(zip(cache[k][0], cache[k][1])) == sorted(zip(expected[k][0], expected[k][1]))
+
+
+def test_spike_train_to_times_rejects_several_channels():
+    with pytest.raises(ValueError):
+        spike_train_to_times(np.zeros((2, 10)))
@@ -0,0 +1,22 @@
+import numpy as np
+import brian2 as b2
+from topology.net import SNN
+from topology.layers import CurrentBasedLIF, Izhikevich
+
+
+def test_current_based_lif_uses_layer_clock():
+    layer = CurrentBasedLIF(np.full(10, 1e-9) * b2.amp, n_neurons=5, name='layer',
+                            method='exponential_euler', dt=0.5 * b2.ms)
+    assert layer.neurons.clock.dt == 0.5 * b2.ms
+    assert layer.method == 'exponential_euler'
+
+
+def test_izhikevich_mix_is_identical_in_every_copy():
+    spec = {'name' : 'test', 'connections' : [],
+            'layers' : [(Izhikevich, dict(name='izh', n_neurons=10, model_type={'RS' : 0.7, 'FS' : 0.3}))]}
+    layer = SNN.from_spec(spec, replicas=3).layers['izh']
+    types = layer.neuron_types.reshape(3, -1)
+    assert np.all(types == types[0])
+    assert list(types[0]).count('FS') == 3
+    a = layer.neurons.a_[:].reshape(3, -1)
+    assert np.allclose(a, a[0])
@@ -0,0 +1,21 @@
+import numpy as np
+import brian2 as b2
+from topology.layers import LIF
+from topology.monitors import RingStateMonitor
+
+
+def test_ring_state_monitor_keeps_last_window():
+    layer = LIF(n_neurons=5, name='layer')
+    ring = RingStateMonitor(layer.neurons, ['v'], window=10)
+    net = b2.Network(layer.neurons, ring)
+    net.run(50 * b2.defaultclock.dt)
+    assert ring.get('v').shape == (5, 10)
+    assert np.allclose(ring.t / b2.defaultclock.dt, np.arange(40, 50))
+
+
+def test_ring_state_monitor_without_recorded_neurons():
+    layer = LIF(n_neurons=5, name='layer')
+    ring = RingStateMonitor(layer.neurons, ['v'], window=10, record=False)
+    net = b2.Network(layer.neurons, ring)
+    net.run(50 * b2.defaultclock.dt)
+    assert ring.get('v').shape == (0, 10)
@@ -0,0 +1,60 @@
+import numpy as np
+import brian2 as b2
+from topology.net import SNN
+from topology.monitors import RecordingPolicy
+from topology.layers import ManualSpikeInput, LIF
+from topology.connections import Diehl_and_Cook_STDP
+from utils import SpikeEventCache
+
+
+def example_network(n_hidden = 12, n_bins = 300, seed = 0, recording = None):
+    '''ManualSpikeInput -> LIF through Diehl_and_Cook_STDP, as in example.py.'''
+    b2.seed(seed)
+    weights = (np.random.default_rng(seed).random((1, n_hidden)) + 0.01) * 0.3
+    input_layer = ManualSpikeInput(np.zeros(n_bins), dt=1, n_neurons=1, name='input_spikes')
+    hidden_layer = LIF(n_neurons=n_hidden, name='hidden_lif_layer')
+    net = SNN(name='test')
+    net.add_layer(input_layer)
+    net.add_layer(hidden_layer, recording)
+    net.add_connection(Diehl_and_Cook_STDP(input_layer, hidden_layer, weights, name='ee_input'))
+    return net
+
+
+def random_events(n_samples, n_bins = 300, seed = 0):
+    rng = np.random.default_rng(seed)
+    x = rng.choice([0, 1], size=(n_samples, n_bins), p=[1. / 3, 2. / 3])
+    return SpikeEventCache.from_arrays(x, np.arange(n_samples) % 2)
+
+
+def test_reset_state_keeps_layer_spiking():
+    net = example_network()
+    record = net.train(random_events(6), 300 * b2.ms, reset='state')
+    assert np.all(record.counts.sum(axis=1) > 0)
+    # Only spike counts are kept by default, memory does not grow with samples
+    assert not net.monitors['hidden_lif_layer'][1].record
+
+
+def test_packed_samples_longer_than_sim_duration():
+    sim_duration, rest = 50 * b2.ms, 10 * b2.ms
+    net = example_network(n_bins=100, recording=RecordingPolicy.spikes_only())
+    net.store()
+    events = random_events(3, n_bins=100)
+    samples = [events[k][:2] for k in range(3)]
+    counts = net.run_samples(samples, sim_duration, rest)
+    net.restore()
+    truncated = [(idx[times < sim_duration], times[times < sim_duration]) for idx, times in samples]
+    assert np.array_equal(counts, net.run_samples(truncated, sim_duration, rest))
+    
+    net.restore()
+    record = net.train(events, sim_duration, pack=3, rest=rest)
+    assert record.counts.shape == (3, 12)
+
+
+def test_non_contiguous_labels():
+    net = example_network()
+    events = random_events(6)
+    events.labels = np.array([1, 2, 1, 2, 1, 2])
+    net.train(events, 300 * b2.ms)
+    assert list(net.classes) == [1, 2]
+    predictions, _ = net.predict(events, 300 * b2.ms)
+    assert set(predictions) <= {1, 2}
@@ -1 +1,17 @@
-from .net import SNN
\ No newline at end of file
+from .net import SNN
+from .monitors import RecordingPolicy
+from .profiling import Profiler
+
+_lazy = {
+    'OnlineInference' : '.online',
+    'OnlineClient'    : '.online',
+    'MonitorRecorder' : '.recorder',
+}
+
+
+def __getattr__(name):
+    # asyncio and h5py are only imported by the modules that need them
+    if name in _lazy:
+        import importlib
+        return getattr(importlib.import_module(_lazy[name], __name__), name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
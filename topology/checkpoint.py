@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+MANIFEST = 'manifest.json'
+
+
+def _digest(values):
+    return hashlib.blake2b(np.ascontiguousarray(values).data, digest_size = 16).hexdigest()
+
+
+def read_manifest(path : str) -> dict:
+    manifest = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest):
+        return {}
+    with open(manifest) as f:
+        return json.load(f)
+
+
+def save_arrays(path : str, arrays : dict, meta : dict) -> list:
+    '''
+    Write arrays as .npy files in the directory path, skipping arrays whose
+    content did not change since the last checkpoint written there.
+    Changed arrays are written under new generation-suffixed names and the
+    manifest referencing them is replaced atomically last, so a crash never
+    leaves a partial checkpoint: the previous manifest and its files stay
+    untouched until then. Files no longer referenced are removed afterwards.
+    Returns the keys of the written arrays.
+    '''
+    os.makedirs(path, exist_ok = True)
+    previous = read_manifest(path)
+    digests = dict(previous.get('arrays', {}))
+    files = {key : _filename(previous, key) for key in digests}
+    generation = previous.get('generation', 0) + 1
+    written = []
+    for key, values in arrays.items():
+        digest = _digest(values)
+        if digests.get(key) == digest:
+            continue
+        files[key] = '{}.{}.npy'.format(key, generation)
+        with open(os.path.join(path, files[key]), 'wb') as f:
+            np.save(f, values)
+            f.flush()
+            os.fsync(f.fileno())
+        digests[key] = digest
+        written.append(key)
+    
+    tmp = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(dict(meta, generation = generation, arrays = digests, files = files), f, indent = 2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    
+    for key in written:
+        if key in previous.get('arrays', {}):
+            stale = os.path.join(path, _filename(previous, key))
+            if os.path.exists(stale):
+                os.remove(stale)
+    return written
+
+
+def _filename(manifest, key):
+    # Manifests written before generations name arrays key.npy
+    return manifest.get('files', {}).get(key, key + '.npy')
+
+
+def load_arrays(path : str):
+    '''
+    Returns the memory-mapped arrays of the checkpoint in path, keyed as given
+    to save_arrays, and its manifest.
+    '''
+    manifest = read_manifest(path)
+    if not manifest:
+        raise FileNotFoundError('No checkpoint in {}'.format(path))
+    arrays = {key : np.load(os.path.join(path, _filename(manifest, key)), mmap_mode = 'r')
+              for key in manifest['arrays']}
+    return arrays, manifest
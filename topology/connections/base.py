@@ -1,17 +1,143 @@
 from abc import ABC, abstractmethod
+import brian2 as b2
+import numpy as np
 
 class AbstractConnection(ABC):
     
-    def __init__(self, source, target, name, weights = None, connect_prob = None):
+    def __init__(self, source, target, name, weights = None, connect_prob = None,
+                 connectivity = None, seed = None, method = 'euler', dt = None):
+        '''
+        Parameters
+        ----------
+        weights : np.array or scipy.sparse matrix
+            Initial weights, shaped (source neurons, target neurons)
+        connect_prob : float
+            Probability of each synapse when connectivity is not given,
+            all-to-all if None
+        connectivity : int or scipy.sparse matrix
+            Number of synapses received by each target neuron (fixed in-degree),
+            or explicit synapses as a (source neurons, target neurons) sparse
+            matrix whose values are the initial weights when weights is None.
+            A sparse weights matrix is also used as connectivity.
+        seed : int
+            Seed of the random connectivity
+        method : str
+            Integration method of the clock-driven synaptic equations
+        dt : brian2.Quantity
+            Time step of the synapses, those of the source layer if None.
+            Spikes are read at this time step, so it should match the source
+            layer, and the target layer too for plastic connections.
+        '''
         super().__init__()
         self.source         = source.neurons
         self.target         = target.neurons
         self.weights        = weights
         self.connect_prob   = connect_prob
+        self.connectivity   = connectivity
+        self.seed           = seed
+        self.replicas       = source.replicas
+        self.method         = method
+        self.dt             = dt
         
         self.name           = name
         self.var_list       = []
+        self.persistent_vars = []
+        self.transient_vars = []
+        
+    def build_synapses(self, model : str, on_pre : str, on_post : str = None) -> b2.Synapses:
+        '''
+        Returns the Synapses from the source to the target group, integrated
+        with the connection method on the source clock unless dt is given.
+        '''
+        clock = self.source.clock if self.dt is None else b2.Clock(self.dt)
+        if on_post is not None and self.target.clock.dt != clock.dt:
+            raise ValueError('Connection {} reads post-synaptic spikes every {} but its target steps every {}'.format(
+                self.name, clock.dt, self.target.clock.dt))
+        return b2.Synapses(source = self.source, target = self.target, model = model,
+                           on_pre = on_pre, on_post = on_post, method = self.method,
+                           clock = clock)
+    
+    def connect(self, weight_var : str = 'w') -> bool:
+        '''
+        Create the synapses described by connect_prob and connectivity, only
+        between neurons of the same copy when layers are replicated (see
+        SNN.from_spec), and set their initial weights.
+        Returns whether initial weights were given.
+        '''
+        n_pre, n_post = self.source.N // self.replicas, self.target.N // self.replicas
+        i, j, w = self._local_synapses(n_pre, n_post)
+        copies = np.arange(self.replicas)[:, np.newaxis]
+        if len(i) == 0:
+            # brian2 cannot connect empty index arrays
+            self.synapses.connect(False)
+        else:
+            self.synapses.connect(i = (i + copies * n_pre).ravel(), j = (j + copies * n_post).ravel())
+        if w is None:
+            return False
+        setattr(self.synapses, weight_var + '_', np.tile(w, self.replicas))
+        return True
+    
+    def _local_synapses(self, n_pre, n_post):
+        '''Returns the (i, j, w) of the synapses of one copy of the layers.'''
+        from scipy import sparse
+        rng = np.random.default_rng(self.seed)
+        connectivity = self.connectivity
+        if connectivity is None and sparse.issparse(self.weights):
+            connectivity = self.weights
+        
+        if sparse.issparse(connectivity):
+            coo = connectivity.tocoo()
+            i, j, w = coo.row, coo.col, coo.data
+        elif connectivity is not None:
+            i = _distinct_rows(rng, n_pre, n_post, connectivity).ravel()
+            j = np.repeat(np.arange(n_post), connectivity)
+            w = None
+        elif self.connect_prob is not None:
+            n_synapses = rng.binomial(n_pre * n_post, self.connect_prob)
+            i, j = np.divmod(_distinct(rng, n_pre * n_post, n_synapses), n_post)
+            w = None
+        else:
+            i, j = np.divmod(np.arange(n_pre * n_post), n_post)
+            w = None
+        
+        if self.weights is None or sparse.issparse(connectivity) and connectivity is self.weights:
+            return i, j, w
+        if sparse.issparse(self.weights):
+            return i, j, np.asarray(self.weights.tocsr()[i, j]).ravel()
+        return i, j, np.asarray(self.weights)[i, j]
         
     @abstractmethod
     def init_connection(self):
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+
+def _distinct(rng, population, k):
+    '''
+    Returns k sorted distinct integers below population. Sparse draws are
+    made with rejection in O(k) memory instead of permuting the population.
+    '''
+    if k > population // 2:
+        return np.sort(rng.choice(population, k, replace = False))
+    chosen = np.unique(rng.integers(0, population, k))
+    while len(chosen) < k:
+        chosen = np.unique(np.concatenate([chosen, rng.integers(0, population, k - len(chosen))]))
+    return chosen
+
+
+def _distinct_rows(rng, population, n_rows, k):
+    '''
+    Returns a (n_rows, k) array whose rows hold k sorted distinct integers
+    below population, all rows being drawn at once.
+    '''
+    if k > population:
+        raise ValueError('Cannot draw {} distinct sources out of {}'.format(k, population))
+    if k > population // 2:
+        return np.sort(rng.random((n_rows, population)).argsort(axis = 1)[:, :k], axis = 1)
+    rows = rng.integers(0, population, (n_rows, k))
+    while True:
+        rows.sort(axis = 1)
+        duplicate = np.zeros(rows.shape, dtype = bool)
+        duplicate[:, 1:] = rows[:, 1:] == rows[:, :-1]
+        if not duplicate.any():
+            return rows
+        rows[duplicate] = rng.integers(0, population, duplicate.sum())
@@ -1,21 +1,20 @@
-import brian2 as b2
 from .base import AbstractConnection
 
 
 class ForwardConnection(AbstractConnection):
 
-    def __init__(self, source, target, name):
+    def __init__(self, source, target, name, weights = None, connect_prob = None,
+                 connectivity = None, seed = None, method = 'euler', dt = None):
         
-        super().__init__(source, target, name)
+        super().__init__(source, target, name, weights, connect_prob, connectivity, seed, method, dt)
         self.connection_type    = 'Forward'
+        self.persistent_vars    = ['w']
         self.init_connection()
 
     def init_connection(self):
         '''
-        Initialize all STDP self.parameters.
-        Weights are randomly initialized
+        Initialize the synapses, weights are given in volt and are zero
+        unless specified
         '''
-        self.synapses = b2.Synapses(source=self.source, target=self.target, 
-                                model='''w : volt''',
-                                on_pre='v += w')
-        self.synapses.connect()
\ No newline at end of file
+        self.synapses = self.build_synapses(model = '''w : volt''', on_pre = 'v += w')
+        self.connect()
\ No newline at end of file
@@ -1,12 +1,16 @@
 import brian2 as b2
+import numpy as np
 from .base import AbstractConnection
 
 class STDPConnection(AbstractConnection):
 
-    def __init__(self, source, target, weights, name, connect_prob = None, parameters = None):
-        super().__init__(source, target, name, weights, connect_prob)
+    def __init__(self, source, target, weights, name, connect_prob = None, parameters = None,
+                 connectivity = None, seed = None, method = 'euler', dt = None):
+        super().__init__(source, target, name, weights, connect_prob, connectivity, seed, method, dt)
         self.connection_type    = 'STDP'
         self.var_list           = ['w']
+        self.persistent_vars    = ['w']
+        self.transient_vars     = ['Apre', 'Apost']
         if parameters:
             self.parameters     = parameters
         else:
@@ -23,7 +27,7 @@ class STDPConnection(AbstractConnection):
     def init_connection(self):
         '''
         Initialize all STDP self.parameters.
-        Weights are randomly initialized
+        Weights are randomly initialized unless specified
         '''
         self.parameters['dApost'] = - self.parameters['dApre'] * self.parameters['taupre'] / self.parameters['taupost'] * 1.05
         self.parameters['dApost'] = self.parameters['dApost'] * self.parameters['gmax']
@@ -45,21 +49,23 @@ class STDPConnection(AbstractConnection):
             w = clip(w + Apre, 0, gmax)
         '''
         
-        self.synapses = b2.Synapses(source=self.source, target=self.target,
-                                    model = synaptic_model, on_pre = on_pre,
-                                    on_post = on_post)
+        self.synapses = self.build_synapses(model = synaptic_model, on_pre = on_pre,
+                                            on_post = on_post)
         self.synapses.namespace.update(self.parameters)
-        self.synapses.connect()
-        self.synapses.w = 'rand() * gmax'
+        if not self.connect():
+            self.synapses.w = 'rand() * gmax'
         
         
 class DA_STDP(AbstractConnection):
     
-    def __init__(self, source, target, name, weights, connect_prob, parameters = None):
-        super().__init__(source, target, name, weights, connect_prob, )
+    def __init__(self, source, target, name, weights, connect_prob, parameters = None,
+                 connectivity = None, seed = None, method = 'euler', dt = None):
+        super().__init__(source, target, name, weights, connect_prob, connectivity, seed, method, dt)
         self.connection_type    = 'DA_STDP'
         self.weights            = weights
         self.var_list           = ['s', 'c', 'd']
+        self.persistent_vars    = ['s']
+        self.transient_vars     = ['c', 'd', 'Apre', 'Apost', 't_event']
         
         if parameters:
             self.parameters = parameters
@@ -84,52 +90,97 @@ class DA_STDP(AbstractConnection):
         self.init_connection()
 
     def init_connection(self):
-         
+        '''
+        Initialize the synapses. Eligibility traces c and dopamine d decay
+        exponentially and only drive s, so they are not integrated at every
+        time step: c, d and s are brought up to date in closed form at pre,
+        post and reward events, from the time t_event of the last update.
+        Between events, recorded c and d hold their value at t_event.
+        '''
+        self.parameters['tau_cd'] = 1 / (1 / self.parameters['tauc'] + 1 / self.parameters['taud'])
+        
         synaptic_model = '''
-            mode: 1
-            dc/dt = -c / tauc : 1 (clock-driven)
-            dd/dt = -d / taud : 1 (clock-driven)
-            ds/dt = mode * c * d / taus : 1 (clock-driven)
+            mode : 1
+            c : 1
+            d : 1
+            s : 1
+            t_event : second
             dApre/dt = -Apre / taupre : 1 (event-driven)
             dApost/dt = -Apost / taupost : 1 (event-driven)
         '''
         
-        on_pre='''
-            ge += s
+        # Integral of ds/dt = mode * c * d / taus since t_event, then decay
+        catch_up = '''
+            s += mode * c * d * tau_cd / taus * (1 - exp(-(t - t_event) / tau_cd))
+            c = c * exp(-(t - t_event) / tauc)
+            d = d * exp(-(t - t_event) / taud)
+            t_event = t
+        '''
+        
+        on_pre = catch_up + '''
+            ge_post += s
             Apre += dApre
             c = clip(c + mode * Apost, -gmax, gmax)
             s = clip(s + (1-mode) * Apost, -gmax, gmax)
         '''
         
-        on_post='''
+        on_post = catch_up + '''
             Apost += dApost
             c = clip(c + mode * Apre, -gmax, gmax)
             s = clip(s + (1-mode) * Apre, -gmax, gmax)
         '''
         
-        self.synapses = b2.Synapses(source=self.source, target=self.target,
-                                    model = synaptic_model, on_pre = on_pre,
-                                    on_post = on_post, method = 'euler')
+        self.synapses = self.build_synapses(model = synaptic_model, on_pre = on_pre,
+                                            on_post = on_post)
         self.synapses.namespace.update(self.parameters)
-        self.synapses.mode  = 0
-        self.synapses.s     = 1e-10
+        # Synaptic variables only exist once the synapses are created
+        if not self.connect(weight_var = 's'):
+            self.synapses.s = 1e-10
         self.synapses.c     = 1e-10
         self.synapses.d     = 0
-        
-        
+        self.synapses.t_event = 't'
         self.synapses.mode  = 1
         
+    def deliver_reward(self, amount, targets = None) -> None:
+        '''
+        Release dopamine at the synapses of some target neurons, at the
+        current simulation time.
+        
+        Parameters
+        ----------
+        amount : float or np.array
+            Dopamine added to d, one value for all targets or one per target
+        targets : np.array
+            Indices of the rewarded target neurons, every neuron if None
+        '''
+        syn = self.synapses
+        reward = np.zeros(self.target.N)
+        reward[slice(None) if targets is None else np.asarray(targets)] = amount
+        post = syn.j[:]
+        idx = np.flatnonzero(reward[post])
+        if len(idx) == 0:
+            return
+        
+        p = {k : float(self.parameters[k] / b2.second) for k in ['tauc', 'taud', 'taus', 'tau_cd']}
+        now = syn.clock.t_
+        elapsed = now - syn.t_event_[idx]
+        c, d = syn.c_[idx], syn.d_[idx]
+        syn.s_[idx] = syn.s_[idx] + syn.mode_[idx] * c * d * p['tau_cd'] / p['taus'] \
+            * (1 - np.exp(-elapsed / p['tau_cd']))
+        syn.c_[idx] = c * np.exp(-elapsed / p['tauc'])
+        syn.d_[idx] = d * np.exp(-elapsed / p['taud']) + reward[post[idx]]
+        syn.t_event_[idx] = now
 
 
-    
-        
-
 class Diehl_and_Cook_STDP(AbstractConnection):
     
-    def __init__(self, source, target, weights, name, connect_prob = None, parameters = None):
-        super().__init__(source, target, name, weights, connect_prob)
+    def __init__(self, source, target, weights, name, connect_prob = None, parameters = None,
+                 connectivity = None, seed = None, method = 'euler', dt = None):
+        super().__init__(source, target, name, weights, connect_prob, connectivity, seed, method, dt)
         self.connection_type    = 'STDP'
         self.var_list           = ['w']
+        self.persistent_vars    = ['w']
+        self.transient_vars     = ['pre', 'post1', 'post2', 'post2before']
         self.weights            = weights
         exp_ee_pre              = 0.2
         
@@ -175,9 +226,7 @@ class Diehl_and_Cook_STDP(AbstractConnection):
             post2 = 1.
         '''
         
-        self.synapses = b2.Synapses(source=self.source, target=self.target,
-                                    model = synaptic_model, on_pre = on_pre,
-                                    on_post = on_post)
+        self.synapses = self.build_synapses(model = synaptic_model, on_pre = on_pre,
+                                            on_post = on_post)
         self.synapses.namespace.update(self.parameters)
-        self.synapses.connect()
-        self.synapses.w = self.weights[self.synapses.i, self.synapses.j]
+        self.connect()
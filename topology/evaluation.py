@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class SpikeCountRecord:
+    '''
+    Preallocated (samples, neurons) record of spike counts, filled by blocks
+    of consecutive samples as they are simulated.
+    '''
+    def __init__(self, n_samples : int, n_neurons : int, labels):
+        self.counts         = np.zeros((n_samples, n_neurons), dtype = np.int32)
+        self.labels         = np.asarray(labels).astype(int)
+    
+    def record(self, first : int, counts : np.array) -> None:
+        self.counts[first:first + len(counts)] = counts
+
+
+def assign_neurons(counts, labels, n_class):
+    '''
+    Assign every neuron to the class for which its mean spike count is the
+    highest, as in Diehl and Cook (2015). Neurons that never spiked are
+    assigned to -1.
+    
+    Parameters
+    ----------
+    counts : np.array
+        Spike counts of shape (samples, neurons)
+    labels : np.array
+        Class index, from 0 to n_class - 1, of every sample
+    n_class : int
+        Number of classes
+
+    Returns
+    -------
+    assignments : np.array
+        Class of every neuron
+    rates : np.array
+        Mean spike count of every neuron for each class, shaped (classes, neurons)
+    '''
+    one_hot = np.asarray(labels)[:, np.newaxis] == np.arange(n_class)
+    class_sizes = np.maximum(one_hot.sum(axis = 0), 1)
+    rates = one_hot.T.astype(float) @ counts / class_sizes[:, np.newaxis]
+    assignments = rates.argmax(axis = 0)
+    assignments[rates.max(axis = 0) == 0] = -1
+    return assignments, rates
+
+
+def predict(counts, assignments, n_class):
+    '''
+    Predict for every sample the class whose assigned neurons have the highest
+    mean spike count.
+    
+    Parameters
+    ----------
+    counts : np.array
+        Spike counts of shape (samples, neurons)
+    assignments : np.array
+        Class of every neuron, as returned by assign_neurons
+    n_class : int
+        Number of classes
+    '''
+    membership = np.asarray(assignments)[:, np.newaxis] == np.arange(n_class)
+    n_assigned = np.maximum(membership.sum(axis = 0), 1)
+    return (counts @ membership.astype(float) / n_assigned).argmax(axis = 1)
+
+
+def accuracy(predictions, labels):
+    return float(np.mean(np.asarray(predictions) == np.asarray(labels).astype(int)))
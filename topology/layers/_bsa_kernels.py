@@ -0,0 +1,39 @@
+"""Numba kernels of BSAEncoder, kept apart so that importing the encoder
+does not import numba."""
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True)
+def bsa_scan(residual, filter_response, step, threshold, spike_times):
+    """Slide the filter over ``residual`` in place and mark spike positions.
+    ``residual`` holds the signal minus every filter already subtracted, so
+    the window at a pointer is simply ``residual[pointer:pointer + size]``.
+    Returns the next pointer that could not be evaluated.
+    """
+    filter_size = filter_response.shape[0]
+    sgnl_size = residual.shape[0]
+    pointer = 0
+    while pointer <= sgnl_size - filter_size - 1:
+        error1 = 0.0
+        error2 = 0.0
+        for k in range(filter_size):
+            value = residual[pointer + k]
+            error1 += np.abs(value - filter_response[k])
+            error2 += np.abs(value)
+        if error1 < error2 - threshold:
+            for k in range(filter_size):
+                residual[pointer + k] -= filter_response[k]
+            spike_times[pointer] = 1
+        pointer += step
+    return pointer
+
+
+@njit(parallel=True, cache=True)
+def bsa_encode_many(signals, filter_response, step, threshold):
+    residual = signals.copy()
+    spike_times = np.zeros(signals.shape, dtype=np.int8)
+    for row in prange(signals.shape[0]):
+        bsa_scan(residual[row], filter_response, step, threshold,
+                  spike_times[row])
+    return spike_times
@@ -5,10 +5,36 @@ class AbstractLayer(ABC):
     '''
     Abstract base class for neuron building.
     '''
-    def __init__(self, n_neurons : int, name : str):
+    def __init__(self, n_neurons : int, name : str, method : str = 'euler', dt = None):
+        '''
+        Parameters
+        ----------
+        n_neurons : int
+            Number of neurons
+        name : str
+            Layer name
+        method : str
+            Integration method of the neuron equations, e.g. 'euler',
+            'exponential_euler' or 'exact' for linear equations
+        dt : brian2.Quantity
+            Time step of the layer, defaultclock.dt if None. Slow populations
+            may step at a coarser dt than the rest of the network.
+        '''
         self.name           = name
         self.n_neurons      = n_neurons
+        self.method         = method
+        self.dt             = dt
+        self.replicas       = 1
         self.var_list       = []
+        self.persistent_vars = []
+        self.transient_vars = []
+        
+    def replicate(self, replicas : int) -> None:
+        '''
+        Called by SNN.from_spec once n_neurons holds replicas copies of the
+        layer, for layers whose neurons differ within a copy.
+        '''
+        self.replicas = replicas
         
     @abstractmethod
     def init_layer(self):
@@ -1,7 +1,4 @@
 import numpy as np
-from scipy import signal
-import matplotlib.pyplot as plt
-from numba import jit, float64, int8
 
 
 class BSAEncoder:
@@ -34,6 +31,8 @@ class BSAEncoder:
         self.threshold = threshold
         self._last_spike_times = None
         self._last_signal = None
+        self._stream_residual = np.zeros(0)
+        self._stream_skip = 0
 
     @property
     def filter_response(self):
@@ -42,7 +41,8 @@ class BSAEncoder:
     @filter_response.setter
     def filter_response(self, new_response):
         if new_response is None:
-            self._filter_response = signal.gaussian(M=51, std=7)
+            from scipy import signal
+            self._filter_response = signal.windows.gaussian(51, std=7)
         else:
             assert isinstance(new_response, np.ndarray), "'filter_response'\
              must be of np.ndarray type."
@@ -90,45 +90,105 @@ class BSAEncoder:
         Notes
         -----
         The spike times will be save in self._last_spikes for later plottings.
-        The encoding procedure is written in compiled mode using
-         numba.jit decorator.
+        The encoding procedure runs a module level kernel compiled once with
+         numba.njit.
         """
 
-        @jit(int8[:](float64[:], float64[:], int8, float64),
-             nopython=True, cache=True)
-        def calc_spike_times(sig, filter_response, step, threshold):
-            filter_size = filter_response.shape[0]
-            sgnl_size = sig.shape[0]
-            windowed_signal = sig[:filter_size].copy()
-            spike_times = np.zeros(sig.shape, dtype=np.int8)
-            for pointer in range(0, sgnl_size, step):
-                if pointer > sgnl_size - filter_size - 1:
-                    break
-                else:
-                    error1 = np.sum(np.abs(windowed_signal - filter_response))
-                    error2 = np.sum(np.abs(windowed_signal))
-                    if error1 < error2 - threshold:
-                        windowed_signal -= filter_response
-                        spike_times[pointer] = 1
-                    windowed_signal = np.concatenate((windowed_signal[step:],
-                                                      sig[filter_size + pointer:
-                                                          filter_size + pointer + step]))
-            return spike_times
-
         assert isinstance(sgnl, np.ndarray), "'sgnl' must be of type\
          numpy.ndarray"
         assert sgnl.ndim == 1, "'sgnl' must be 1d array."
+        from ._bsa_kernels import bsa_scan
         self._last_signal = sgnl.copy()
-        spikes = calc_spike_times(sig=sgnl,
-                                  filter_response=self.filter_response,
-                                  step=self.step,
-                                  threshold=float(self.threshold))
+        filter_response, step, threshold = self._filter_args()
+        spikes = np.zeros(sgnl.shape, dtype=np.int8)
+        bsa_scan(sgnl.astype(np.float64), filter_response, step, threshold,
+                  spikes)
         self._last_spike_times = np.where(spikes == 1)[0]
         return spikes
 
+    def encode_many(self, signals):
+        """Encode a batch of signals, one signal per row.
+        Parameters
+        ----------
+        signals : :obj: 'np.ndarray' , 2d array.
+            Signals to be encoded, with shape (n_signals, n_samples).
+        Notes
+        -----
+        Rows are encoded in parallel with numba.prange and each row gives
+         the same spikes as `encode`. Nothing is kept for plotting.
+        """
+
+        assert isinstance(signals, np.ndarray), "'signals' must be of type\
+         numpy.ndarray"
+        assert signals.ndim == 2, "'signals' must be 2d array."
+        from ._bsa_kernels import bsa_encode_many
+        filter_response, step, threshold = self._filter_args()
+        return bsa_encode_many(np.ascontiguousarray(signals,
+                                                     dtype=np.float64),
+                                filter_response, step, threshold)
+
+    def encode_chunk(self, chunk):
+        """Encode the next chunk of a signal stream.
+        Parameters
+        ----------
+        chunk : :obj: 'np.ndarray' , 1d array.
+            Next samples of the stream.
+        Returns
+        -------
+        spikes : :obj: 'np.ndarray' , 1d int8 array.
+            Spikes for every position that can no longer change. A position
+             needs a full filter window after it before it is decided, so
+             the output lags the input by at most len(filter_response)
+             samples. Concatenating the outputs of every call followed by
+             `flush_stream` gives the same array as a one-shot `encode`.
+        Notes
+        -----
+        Only the residual of the last window is kept between calls, memory
+         does not grow with the stream length. When step jumps past the end
+         of the residual, the positions jumped over are skipped in the next
+         chunks.
+        """
+
+        assert isinstance(chunk, np.ndarray), "'chunk' must be of type\
+         numpy.ndarray"
+        assert chunk.ndim == 1, "'chunk' must be 1d array."
+        from ._bsa_kernels import bsa_scan
+        filter_response, step, threshold = self._filter_args()
+        skipped = min(self._stream_skip, len(chunk))
+        self._stream_skip -= skipped
+        residual = np.concatenate((self._stream_residual,
+                                   chunk[skipped:].astype(np.float64)))
+        spikes = np.zeros(residual.shape, dtype=np.int8)
+        pointer = bsa_scan(residual, filter_response, step, threshold, spikes)
+        self._stream_residual = residual[pointer:]
+        self._stream_skip += max(pointer - len(residual), 0)
+        return np.concatenate((np.zeros(skipped, dtype=np.int8),
+                               spikes[:pointer]))
+
+    def flush_stream(self):
+        """Close the current stream and return the spikes still pending.
+        The last positions of a signal never get a full window, they are
+         always silent, exactly like the tail of a one-shot `encode`.
+        """
+
+        spikes = np.zeros(self._stream_residual.shape, dtype=np.int8)
+        self.reset_stream()
+        return spikes
+
+    def reset_stream(self):
+        """Drop the window state of the current stream."""
+
+        self._stream_residual = np.zeros(0)
+        self._stream_skip = 0
+
+    def _filter_args(self):
+        return (np.ascontiguousarray(self.filter_response, dtype=np.float64),
+                self.step, float(self.threshold))
+
     def plot(self):
         """Plot encoded version and original version of last signal."""
 
+        import matplotlib.pyplot as plt
         assert self._last_signal is not None, "You must encode at least one\
          signal to perform plotting."
         fig, [ax0, ax1] = plt.subplots(nrows=2, sharex=True)
@@ -138,16 +198,72 @@ class BSAEncoder:
         ax1.set_yticks([1])
         plt.show()
 
-    def decode(self):
-        """Decodes last encoded signal and plots two signals together."""
-
-        orig = self._last_signal
-        encoded = self._last_spike_times
-        decoded = np.zeros(orig.shape)
-        for spike_time in encoded:
-            decoded[spike_time: spike_time + len(self.filter_response)] += self.filter_response
-        decoded = cv2.normalize(decoded, None, 0.0, 1.0, cv2.NORM_MINMAX)
-        plt.plot(orig, label='original')
-        plt.plot(decoded, label='decoded')
-        plt.legend()
-        plt.show()
\ No newline at end of file
+    def decode(self, spikes=None, plot=False):
+        """Reconstruct a signal from its spike train.
+        Parameters
+        ----------
+        spikes : :obj: 'np.ndarray' , 1d array. optional.
+            Default: spikes of the last encoded signal.
+            Spike train returned by `encode`.
+        plot : bool, optional.
+            Default: False
+            Plot the last encoded signal and its reconstruction together.
+        """
+
+        if spikes is None:
+            assert self._last_signal is not None, "You must encode at least\
+             one signal or give 'spikes' to perform decoding."
+            spikes = np.zeros(self._last_signal.shape)
+            spikes[self._last_spike_times] = 1
+        assert spikes.ndim == 1, "'spikes' must be 1d array."
+        decoded = self.decode_many(spikes[np.newaxis, :])[0]
+        if plot:
+            import matplotlib.pyplot as plt
+            plt.plot(self._last_signal, label='original')
+            plt.plot(decoded, label='decoded')
+            plt.legend()
+            plt.show()
+        return decoded
+
+    def decode_many(self, spikes):
+        """Reconstruct a batch of signals, one spike train per row.
+        The reconstruction is the convolution of every spike train with the
+         filter response, computed with overlap-add FFTs over the batch.
+        Parameters
+        ----------
+        spikes : :obj: 'np.ndarray' , 2d array.
+            Spike trains with shape (n_signals, n_samples).
+        """
+
+        from scipy import signal
+        assert spikes.ndim == 2, "'spikes' must be 2d array."
+        n_samples = spikes.shape[1]
+        decoded = signal.oaconvolve(spikes.astype(np.float64),
+                                    self.filter_response[np.newaxis, :],
+                                    axes=1)
+        return decoded[:, :n_samples]
+
+    @staticmethod
+    def reconstruction_error(signals, decoded):
+        """Per signal reconstruction error.
+        Parameters
+        ----------
+        signals : :obj: 'np.ndarray' , 1d or 2d array.
+            Original signals, one per row.
+        decoded : :obj: 'np.ndarray' , same shape as signals.
+            Output of `decode` or `decode_many`.
+        Returns
+        -------
+        rmse : :obj: 'np.ndarray'
+            Root mean squared error of every signal.
+        snr : :obj: 'np.ndarray'
+            Signal to reconstruction-noise ratio of every signal, in dB.
+        """
+
+        signals = np.atleast_2d(signals)
+        error = signals - np.atleast_2d(decoded)
+        noise_power = np.mean(error ** 2, axis=1)
+        signal_power = np.mean(signals ** 2, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            snr = 10 * np.log10(signal_power / noise_power)
+        return np.sqrt(noise_power), snr
@@ -8,8 +8,8 @@ class HiddenLayer(AbstractLayer):
     '''
     Abstract base class for neuron building.
     '''
-    def __init__(self, n_neurons : int, name : str):
-        super().__init__(n_neurons, name)
+    def __init__(self, n_neurons : int, name : str, method : str = 'euler', dt = None):
+        super().__init__(n_neurons, name, method, dt)
         self.var_list       = ['v']
         
     def init_layer(self):
@@ -23,9 +23,11 @@ class LIF(HiddenLayer):
     '''
     Implementation of the LIF neuron model
     '''
-    def __init__(self, n_neurons : int, name : str):
-        super().__init__(n_neurons, name)
+    def __init__(self, n_neurons : int, name : str, method : str = 'euler', dt = None):
+        super().__init__(n_neurons, name, method, dt)
         self.neuron_type = 'LIF'
+        self.persistent_vars = ['vth']
+        self.transient_vars = ['v', 'ge']
         # self.parameters = {
         #     'v_rest' : (-55. + random.randint(0, 15)) * b2.mV,
         #     'v_reset' : None,
@@ -63,43 +65,116 @@ class LIF(HiddenLayer):
         
         self.neurons = b2.NeuronGroup(self.n_neurons, model = lif_equation, 
                                     reset = 'v = v_reset', threshold = 'v > vth',
-                                    refractory = self.parameters['tau_ref'], method = 'euler')
+                                    refractory = self.parameters['tau_ref'], method = self.method,
+                                    dt = self.dt)
         self.neurons.namespace.update(self.parameters)
         self.neurons.v = 'v_rest + rand() * (v_th - v_rest)'
         self.neurons.vth = 'v_th + rand()*5*mV'
         
 class Izhikevich(HiddenLayer):
     '''
-    Implementation of the Izhikevich neuron model
+    Implementation of the Izhikevich neuron model.
+    A population may mix several model types, a, b, c and d are then per
+    neuron parameters of a single NeuronGroup.
 
     TODO : Thalamic input
     '''
-    def __init__(self, name : str, n_neurons : int = 10, model_type : str = 'RS'):
-        super().__init__(n_neurons, name)
+    MODEL_TYPES = {
+        'RS' : {'a': 0.02 / b2.ms, 'b': 0.20 / b2.ms, 'c': -65.0 * b2.mV, 'd': 8.00 * (b2.mV / b2.ms)},
+        'IB' : {'a': 0.02 / b2.ms, 'b': 0.20 / b2.ms, 'c': -55.0 * b2.mV, 'd': 4.00 * (b2.mV / b2.ms)},
+        'CH' : {'a': 0.02 / b2.ms, 'b': 0.20 / b2.ms, 'c': -50.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)},
+        'FS' : {'a': 0.10 / b2.ms, 'b': 0.20 / b2.ms, 'c': -65.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)},
+        'TC' : {'a': 0.02 / b2.ms, 'b': 0.25 / b2.ms, 'c': -65.0 * b2.mV, 'd': 0.05 * (b2.mV / b2.ms)},
+        'RZ' : {'a': 0.10 / b2.ms, 'b': 0.25 / b2.ms, 'c': -65.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)},
+        'LTS' : {'a': 0.02 / b2.ms, 'b': 0.25 / b2.ms, 'c': -65.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)}
+    }
+
+    def __init__(self, name : str, n_neurons : int = 10, model_type = 'RS', method : str = 'euler',
+                 dt = None):
+        '''
+        Parameters
+        ----------
+        name : str
+            Layer name
+        n_neurons : int
+            Number of neurons
+        model_type : str or dict
+            Either a single model type ('RS', 'FS', 'LTS'...) or a mix given as
+            {model type : count} or {model type : fraction}. Neurons of a type
+            are contiguous, in the order of the dict. Counts are repeated when
+            n_neurons is a multiple of their sum. Replicated layers (see
+            SNN.from_spec) repeat the mix of a single copy.
+        method : str
+            Integration method
+        dt : brian2.Quantity
+            Time step of the layer, defaultclock.dt if None
+        '''
+        super().__init__(n_neurons, name, method, dt)
         self.neuron_type = 'Izhikevich'
         self.model_type = model_type
-        self.parameters = {
-            'RS' : {'a': 0.02 / b2.ms, 'b': 0.20 / b2.ms, 'c': -65.0 * b2.mV, 'd': 8.00 * (b2.mV / b2.ms)},
-            'IB' : {'a': 0.02 / b2.ms, 'b': 0.20 / b2.ms, 'c': -55.0 * b2.mV, 'd': 4.00 * (b2.mV / b2.ms)},
-            'CH' : {'a': 0.02 / b2.ms, 'b': 0.20 / b2.ms, 'c': -50.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)},
-            'FS' : {'a': 0.10 / b2.ms, 'b': 0.20 / b2.ms, 'c': -65.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)},
-            'TC' : {'a': 0.02 / b2.ms, 'b': 0.25 / b2.ms, 'c': -65.0 * b2.mV, 'd': 0.05 * (b2.mV / b2.ms)},
-            'RZ' : {'a': 0.10 / b2.ms, 'b': 0.25 / b2.ms, 'c': -65.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)},
-            'LTS' : {'a': 0.02 / b2.ms, 'b': 0.25 / b2.ms, 'c': -65.0 * b2.mV, 'd': 2.00 * (b2.mV / b2.ms)}
-        }[self.model_type]
+        self.transient_vars = ['v', 'u']
+        self._set_model_types()
         self.init_layer()
+
+    def replicate(self, replicas : int) -> None:
+        super().replicate(replicas)
+        self._set_model_types()
+        self._apply_parameters()
+
+    def _set_model_types(self):
+        # The mix is laid out within a copy, then repeated over the copies
+        self.neuron_types = np.tile(self.type_sequence(self.model_type, self.n_neurons // self.replicas),
+                                    self.replicas)
+        types, inverse = np.unique(self.neuron_types, return_inverse = True)
+        self.parameters = {var : b2.Quantity([self.MODEL_TYPES[t][var] for t in types])[inverse]
+                           for var in ['a', 'b', 'c', 'd']}
+
+    def _apply_parameters(self):
+        for var, values in self.parameters.items():
+            setattr(self.neurons, var, values)
+        self.neurons.v = 'c'
+        self.neurons.u = 'b * v'
+
+    @classmethod
+    def type_sequence(cls, model_type, n_neurons : int) -> np.array:
+        '''
+        Returns the model type of every neuron for a model_type argument.
+        '''
+        if isinstance(model_type, str):
+            model_type = {model_type : n_neurons}
+        unknown = set(model_type) - set(cls.MODEL_TYPES)
+        if unknown:
+            raise ValueError('Unknown Izhikevich model types : {}'.format(sorted(unknown)))
+        
+        shares = np.array(list(model_type.values()))
+        if np.issubdtype(shares.dtype, np.integer):
+            total = shares.sum()
+            if total == 0 or n_neurons % total:
+                raise ValueError('n_neurons ({}) must be a multiple of the type counts ({})'.format(n_neurons, total))
+            counts = shares * (n_neurons // total)
+        else:
+            if not np.isclose(shares.sum(), 1):
+                raise ValueError('Model type fractions must sum to 1')
+            # Largest remainder rounding so that counts sum to n_neurons
+            exact = shares * n_neurons
+            counts = np.floor(exact).astype(int)
+            remainder = n_neurons - counts.sum()
+            counts[np.argsort(counts - exact)[:remainder]] += 1
+        return np.repeat(list(model_type), counts)
         
     def init_layer(self):
         '''
-        Initialize all LIF parameters as well as model equation.
-        The membrane threshold and potential are both initialized randomly for
-        each neuron in the group.
+        Initialize the model equation, with a, b, c and d stored per neuron.
         '''
             
         eqs = '''
             dv/dt = (0.04/ms/mV) * v**2 + (5/ms) * v + 140*mV/ms - u + I: volt
             du/dt = a*(b*v-u) : volt/second
             I : volt/second
+            a : 1/second (constant)
+            b : 1/second (constant)
+            c : volt (constant)
+            d : volt/second (constant)
         '''
         
         reset ='''
@@ -108,10 +183,9 @@ class Izhikevich(HiddenLayer):
         '''
         
         self.neurons = b2.NeuronGroup(self.n_neurons, model = eqs, 
-                                    reset = reset, threshold = 'v > 30 * mV', method = 'euler')
-        self.neurons.namespace.update(self.parameters)
-        self.neurons.v = self.parameters['c']
-        self.neurons.u = self.parameters['b'] * self.neurons.v
+                                    reset = reset, threshold = 'v > 30 * mV', method = self.method,
+                                    dt = self.dt)
+        self._apply_parameters()
         self.neurons.I = 0 * b2.mV / b2.ms
         #self.neurons.vth = '-55*mV + rand()*15*mV'
         
@@ -120,11 +194,14 @@ class Diehl_and_Cook_LIF(HiddenLayer):
     '''
     Implementation of the LIF neuron model used in Diehl and Cook's paper.
     '''
-    def __init__(self, n_neurons : int, name : str, mode : str = 'train', weight_path = None):
-        super().__init__(n_neurons, name)
+    def __init__(self, n_neurons : int, name : str, mode : str = 'train', weight_path = None,
+                 method : str = 'euler', dt = None):
+        super().__init__(n_neurons, name, method, dt)
         self.neuron_type    = 'LIF'
         self.mode           = mode
         self.weight_path    = weight_path
+        self.persistent_vars = ['theta']
+        self.transient_vars = ['v', 'ge', 'timer']
     
         self.parameters     = {
             'v_rest' : -65. * b2.mV,
@@ -163,11 +240,13 @@ class Diehl_and_Cook_LIF(HiddenLayer):
                                     threshold = v_th, 
                                     refractory = self.parameters['refrac'],
                                     reset = self.parameters['scr'],
-                                    method = 'euler')         
+                                    method = self.method, dt = self.dt)         
         self.neurons.namespace.update(self.parameters)
     
         if self.mode == 'test' or self.weight_path:
-            self.neurons.theta = np.load(weight_path)
+            # Replicated layers (see SNN.from_spec) repeat the saved thresholds
+            theta = np.load(self.weight_path)
+            self.neurons.theta = np.tile(theta, self.n_neurons // len(theta))
         else:
             self.neurons.theta = np.ones((self.n_neurons)) * 20.0 * b2.mV
         
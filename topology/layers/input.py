@@ -1,6 +1,6 @@
 import brian2 as b2
 from .base import AbstractLayer
-from utils import spike_train_to_times
+from utils import spike_train_to_events
 import numpy as np
 import random
 
@@ -8,51 +8,80 @@ class PoissonInput(AbstractLayer):
     '''
     Creates Poisson distributed spike trains
     '''
-    def __init__(self, n_neurons : int, name : str, freq : int):
-        super().__init__(n_neurons, name)
+    def __init__(self, n_neurons : int, name : str, freq : int, dt = None):
+        super().__init__(n_neurons, name, dt = dt)
         self.freq       = freq * b2.Hz
         self.init_layer()
         
     def init_layer(self):
-        self.neurons = b2.PoissonGroup(self.n_neurons, rates=self.freq)
+        self.neurons = b2.PoissonGroup(self.n_neurons, rates=self.freq, dt=self.dt)
         
         
 class ManualSpikeInput(AbstractLayer):
     '''
     Uses a spike train array to get spike times and build a SpikeGeneratorGroup.
+    A (channels, time) array feeds one channel per neuron, channels being mapped
+    to the last neurons of the group.
     '''
-    def __init__(self, spike_trains, dt, n_neurons : int, name : str):
-        super().__init__(n_neurons, name)
-        self.dt             = dt
+    def __init__(self, spike_trains, dt, n_neurons : int, name : str, clock_dt = None):
+        '''
+        dt is the bin width of spike_trains in ms, clock_dt the time step of
+        the SpikeGeneratorGroup (defaultclock.dt if None).
+        '''
+        super().__init__(n_neurons, name, dt = clock_dt)
+        self.bin_dt         = dt
         self.spike_trains   = spike_trains
         self.init_layer()
 
-    def get_input_stream(self, spike_times):
+    def get_input_stream(self, spike_times, indices = None):
         '''Returns a brian2 SpikeGeneratorGroup representing input spike times.
         
         Parameters
         ----------
-        n_neurons : int
-            Number of neurons in the group
         spike_times : np.array
             Array containing spike times. If quantity is not specified the times are set in ms.
+        indices : np.array
+            Neuron index of every spike, all spikes go to the last neuron if None.
+            Events must be sorted by time, then index.
 
         '''
-        indices = [self.n_neurons - 1 for i in range(len(spike_times))]
-        G = b2.SpikeGeneratorGroup(self.n_neurons, indices, spike_times)
+        if indices is None:
+            indices = np.full(len(spike_times), self.n_neurons - 1)
+        G = b2.SpikeGeneratorGroup(self.n_neurons, indices, spike_times, sorted = True, dt = self.dt)
         return G
+    
+    def to_events(self, spike_trains):
+        '''Returns the (indices, times) events of a spike train or of a
+        (channels, time) array, sorted by time then index.'''
+        indices, times = spike_train_to_events(spike_trains, dt = self.bin_dt)
+        n_channels = 1 if np.ndim(spike_trains) == 1 else len(spike_trains)
+        return indices + self.n_neurons // self.replicas - n_channels, times
+    
+    def set_spike_trains(self, spike_trains) -> None:
+        '''Replace the input spikes by those of a spike train or of a
+        (channels, time) array, starting at time 0.'''
+        self.set_events(*self.to_events(spike_trains))
+    
+    def set_events(self, indices, times) -> None:
+        '''Replace the input spikes. Events already sorted by time then index,
+        as produced by spike_train_to_events, are not sorted again.'''
+        dt, di = np.diff(np.asarray(times)), np.diff(indices)
+        is_sorted = bool(np.all((dt > 0) | ((dt == 0) & (di > 0))))
+        self.neurons.set_spikes(indices, times, sorted = is_sorted)
             
     def init_layer(self):
-        self.spike_times = spike_train_to_times(self.spike_trains, dt=self.dt)
-        self.neurons = self.get_input_stream(self.spike_times)
+        indices, self.spike_times = self.to_events(self.spike_trains)
+        self.neurons = self.get_input_stream(self.spike_times, indices)
 
         
 class CurrentBasedLIF(AbstractLayer):
 
-    def __init__(self, input_current : np.array, n_neurons : int, name : str):
-        super().__init__(n_neurons, name)
+    def __init__(self, input_current : np.array, n_neurons : int, name : str,
+                 method : str = 'euler', dt = None):
+        super().__init__(n_neurons, name, method, dt)
         self.neuron_type    = 'CurrentBasedLIF'
         self.var_list       = ['v', 'vth', 'I']
+        self.transient_vars = ['v', 'g']
         self.input_current  = b2.TimedArray(input_current, dt=1*b2.ms)
         self.parameters = {
             'v_rest' : 0 * b2.mV,
@@ -78,7 +107,8 @@ class CurrentBasedLIF(AbstractLayer):
         
         self.neurons = b2.NeuronGroup(self.n_neurons, model = lif_equation, 
                                     reset = 'v = v_rest', threshold = 'v > vth',
-                                    refractory = self.parameters['tau_ref'], method = 'euler')
+                                    refractory = self.parameters['tau_ref'], method = self.method,
+                                    dt = self.dt)
         self.neurons.namespace['input_current'] = self.input_current
         self.neurons.namespace.update(self.parameters)
         self.neurons.v = 'v_rest + rand() * mV'
\ No newline at end of file
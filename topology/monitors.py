@@ -0,0 +1,101 @@
+import brian2 as b2
+import numpy as np
+
+
+class RecordingPolicy:
+    '''
+    Describes the monitors SNN.add_layer and SNN.add_connection attach to a
+    neuron group or to synapses.
+    '''
+    def __init__(self, variables = None, record = True, dt = None, window = None, spikes = 'full'):
+        '''
+        Parameters
+        ----------
+        variables : list
+            State variables to record, defaults to the var_list of the layer or
+            connection. An empty list disables state recording.
+        record : bool or list
+            Indices of the neurons (or synapses) whose state is recorded.
+        dt : brian2.Quantity
+            Recording interval, defaults to the clock of the group.
+        window : int
+            Only keep the last window recorded values in a ring buffer
+            (see RingStateMonitor).
+        spikes : str
+            'full' records the index and time of every spike, 'count' only
+            keeps the spike count of each neuron, None records nothing.
+            Ignored for connections.
+        '''
+        self.variables      = variables
+        self.record         = record
+        self.dt             = dt
+        self.window         = window
+        self.spikes         = spikes
+    
+    @classmethod
+    def off(cls):
+        return cls(variables = [], spikes = None)
+    
+    @classmethod
+    def spikes_only(cls):
+        return cls(variables = [])
+    
+    @classmethod
+    def counts_only(cls):
+        return cls(variables = [], spikes = 'count')
+    
+    def state_monitor(self, group, var_list):
+        '''Returns the state monitor of group, or None if nothing is recorded.'''
+        variables = var_list if self.variables is None else self.variables
+        if not variables:
+            return None
+        if self.window:
+            return RingStateMonitor(group, variables, self.window, record = self.record, dt = self.dt)
+        if self.dt is None:
+            return b2.StateMonitor(group, variables, record = self.record)
+        return b2.StateMonitor(group, variables, record = self.record, dt = self.dt)
+    
+    def spike_monitor(self, group):
+        '''Returns the spike monitor of group, or None if nothing is recorded.'''
+        if self.spikes is None:
+            return None
+        return b2.SpikeMonitor(group, record = self.spikes == 'full')
+
+
+class RingStateMonitor(b2.NetworkOperation):
+    '''
+    Records state variables in a fixed size ring buffer, so that only the last
+    window values are kept however long the simulation runs.
+    Values are recorded by a compiled StateMonitor, this operation only runs
+    once every window recordings to move them aside and clear the monitor,
+    so at most 2 * window values are held and Python is not called per step.
+    '''
+    def __init__(self, group, variables, window, record = True, dt = None):
+        if dt is None:
+            self.monitor = b2.StateMonitor(group, variables, record = record)
+            dt = group.clock.dt
+        else:
+            self.monitor = b2.StateMonitor(group, variables, record = record, dt = dt)
+        super().__init__(self._rotate, dt = window * dt, when = 'end')
+        self.contained_objects.append(self.monitor)
+        self.group          = group
+        self.record_variables = list(variables)
+        self.window         = window
+        self._t             = np.zeros(0)
+        self._values        = {var : np.zeros((len(self.monitor.record), 0))
+                               for var in self.record_variables}
+    
+    def _rotate(self):
+        self._t = self.monitor.t_[:].copy()
+        for var in self.record_variables:
+            self._values[var] = np.array(getattr(self.monitor, var + '_'))
+        self.monitor.resize(0)
+    
+    @property
+    def t(self):
+        return np.concatenate([self._t, self.monitor.t_[:]])[-self.window:] * b2.second
+    
+    def get(self, var):
+        '''Returns the recorded values of var, shaped (neurons, times) like a StateMonitor.'''
+        values = np.concatenate([self._values[var], np.asarray(getattr(self.monitor, var + '_'))], axis = 1)
+        return b2.Quantity(values[:, -self.window:], dim = self.group.variables[var].dim)
@@ -1,7 +1,14 @@
 import brian2 as b2
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
 from tqdm import tqdm
-from utils import spike_train_to_times, plot_spiking_activity
+from utils import SpikeEventCache, plot_spiking_activity
+from .monitors import RecordingPolicy
+from . import checkpoint
+from .profiling import Profiler
+from .evaluation import SpikeCountRecord, assign_neurons, predict, accuracy
 
 class SNN(b2.Network):
     '''
@@ -13,32 +20,217 @@ class SNN(b2.Network):
         self.layers = {}
         self.connections = {}
         self.monitors = {}
+        self.spec = None
+        self.replicas = 1
+        self.profiler = None
+        self.training_profile = None
+        self.assignments = None
+        self.n_class = None
+        self.classes = None
+        self.initial_state = {}
     
-    def add_layer(self, layer : object) -> None:
+    @classmethod
+    def from_spec(cls, spec : dict, replicas : int = 1, state : dict = None) -> 'SNN':
+        '''
+        Build a network from a picklable description, so that it can be rebuilt
+        in another process.
+        
+        Parameters
+        ----------
+        spec : dict
+            {'name' : str,
+             'layers' : [(layer class, kwargs), ...],
+             'connections' : [(connection class, kwargs), ...]}
+            The 'source' and 'target' kwargs of connections are layer names,
+            layer kwargs must give n_neurons when replicas > 1.
+        replicas : int
+            Number of copies of the network simulated side by side. Every layer
+            holds replicas * n_neurons neurons and connections only link
+            neurons of the same copy, so that run_samples simulates one sample
+            per copy in a single run.
+        state : dict
+            Persistent state returned by get_persistent_state, loaded in the
+            network. Connections are created with the synapses it holds
+            instead of drawing their connectivity again.
+        '''
+        net = cls(name = spec['name'])
+        net.replicas = replicas
+        for layer_cls, kwargs in spec['layers']:
+            if replicas > 1:
+                kwargs = dict(kwargs, n_neurons = kwargs['n_neurons'] * replicas)
+            layer = layer_cls(**kwargs)
+            layer.replicate(replicas)
+            net.add_layer(layer)
+        for conn_cls, kwargs in spec['connections']:
+            kwargs = dict(kwargs, source = net.layers[kwargs['source']],
+                          target = net.layers[kwargs['target']])
+            if state is not None:
+                kwargs['connectivity'] = _synapse_matrix(state[kwargs['name']], kwargs['source'],
+                                                         kwargs['target'], replicas)
+            net.add_connection(conn_cls(**kwargs))
+        net.spec = spec
+        if state is not None:
+            net.set_persistent_state(state)
+        return net
+    
+    def get_persistent_state(self, initial : bool = False) -> dict:
+        '''
+        Returns the unitless values of the persistent variables (weights,
+        adaptive thresholds...) of every layer and connection, keyed by name,
+        with the synapse indices i and j of connections, which may have been
+        drawn at random. Only the first copy of a replicated network is
+        returned.
+        With initial, the initial values of the transient variables (see
+        reset_state) are added, so that a network rebuilt from its spec starts
+        from the same, possibly random, membrane potentials.
+        '''
+        state = {name : {var : self._first_copy(getattr(group, var + '_')).copy()
+                         for var in obj.persistent_vars}
+                 for name, obj, group in self._brian_groups()}
+        for name, conn in self.connections.items():
+            state[name].update(i = self._first_copy(conn.synapses.i[:]).copy(),
+                               j = self._first_copy(conn.synapses.j[:]).copy())
+        if initial:
+            for name, values in self.initial_state.items():
+                state[name].update({var : self._first_copy(value).copy() for var, value in values.items()})
+        return state
+    
+    def set_persistent_state(self, state : dict) -> None:
+        '''
+        Load values returned by get_persistent_state and store the network so
+        that restore() keeps them. Values of a single network are repeated
+        over the copies of a replicated network. Transient variables also
+        become the initial values used by reset_state. Synapses must match
+        those of the state, see from_spec.
+        '''
+        groups = {name : group for name, _, group in self._brian_groups()}
+        for name, values in state.items():
+            group = groups[name]
+            if 'i' in values and not (np.array_equal(self._first_copy(group.i[:]), values['i']) and
+                                      np.array_equal(self._first_copy(group.j[:]), values['j'])):
+                raise ValueError('Synapses of {} do not match the state'.format(name))
+            for var, value in values.items():
+                if var in ('i', 'j'):
+                    continue
+                size = len(getattr(group, var + '_'))
+                if size != len(value) * self.replicas:
+                    raise ValueError('{}.{} holds {} values, {} copies of {} were given'.format(
+                        name, var, size, self.replicas, len(value)))
+                value = np.tile(value, self.replicas)
+                setattr(group, var + '_', value)
+                if var in self.initial_state[name]:
+                    self.initial_state[name][var] = value
+        self.store()
+    
+    def save_checkpoint(self, path : str, **meta) -> list:
+        '''
+        Save the synapse indices and persistent variables of every connection
+        and layer as .npy files in the directory path. Arrays that did not
+        change since the previous checkpoint written in path are skipped.
+        Extra keyword arguments are stored in the manifest.
+        Returns the names of the written arrays.
+        '''
+        arrays = {}
+        for name, obj, group in self._brian_groups():
+            if name in self.connections:
+                arrays[name + '.i'] = group.i[:]
+                arrays[name + '.j'] = group.j[:]
+            for var in obj.persistent_vars:
+                arrays['{}.{}'.format(name, var)] = getattr(group, var + '_')[:]
+        return checkpoint.save_arrays(path, arrays, dict(meta, t = float(self.t / b2.second)))
+    
+    def load_checkpoint(self, path : str) -> dict:
+        '''
+        Load a checkpoint written by save_checkpoint into a network with the
+        same layers and connections. Arrays are memory-mapped and copied
+        straight into the brian2 variables. Connections without synapses are
+        connected as in the checkpoint.
+        Returns the checkpoint manifest.
+        '''
+        arrays, manifest = checkpoint.load_arrays(path)
+        for name, obj, group in self._brian_groups():
+            if name in self.connections:
+                i, j = arrays[name + '.i'], arrays[name + '.j']
+                if len(group) == 0:
+                    group.connect(i = np.asarray(i), j = np.asarray(j))
+                elif not (np.array_equal(group.i[:], i) and np.array_equal(group.j[:], j)):
+                    raise ValueError('Synapses of {} do not match the checkpoint'.format(name))
+            for var in obj.persistent_vars:
+                group.variables[var].set_value(arrays['{}.{}'.format(name, var)])
+        return manifest
+    
+    def reset_state(self) -> None:
+        '''
+        Reset in place the transient variables (membrane potentials,
+        conductances, STDP traces, refractory timers, spike counts) of every
+        layer and connection to the values they had when added to the network,
+        keeping learned weights and thresholds.
+        Unlike restore(), nothing else is copied and time keeps running.
+        '''
+        for name, obj, group in self._brian_groups():
+            for var, values in self.initial_state[name].items():
+                group.variables[var].set_value(values)
+            if 'lastspike' in group.variables:
+                group.lastspike = -1e4 * b2.second
+                group.not_refractory = True
+        for monitor in self.objects:
+            if isinstance(monitor, b2.SpikeMonitor):
+                monitor.variables['count'].set_value(0)
+    
+    def _stage(self, name):
+        return nullcontext() if self.profiler is None else self.profiler.stage(name)
+    
+    def _first_copy(self, values):
+        return values[:len(values) // self.replicas]
+    
+    def _snapshot(self, name, obj, group):
+        '''Keep the initial values of the transient variables, e.g. the random
+        membrane potentials drawn by init_layer, for reset_state.'''
+        self.initial_state[name] = {var : np.copy(getattr(group, var + '_')[:])
+                                    for var in obj.transient_vars}
+    
+    def _brian_groups(self):
+        '''Yields (name, layer or connection, brian2 group) of every object.'''
+        for name, layer in self.layers.items():
+            yield name, layer, layer.neurons
+        for name, conn in self.connections.items():
+            yield name, conn, conn.synapses
+    
+    def add_layer(self, layer : object, recording : RecordingPolicy = None) -> None:
         '''
         Add a neuron layer to the Network.
-        This method also provides monitor for the NeuronGroup created.
+        This method also provides monitors for the NeuronGroup created, as
+        described by the recording policy. By default only spike counts are
+        kept, so that memory does not grow during training. Packing samples
+        or resting in train needs spike times, see RecordingPolicy.spikes_only.
         '''
+        recording = recording or RecordingPolicy.counts_only()
         neurons = layer.neurons
-        var_list = layer.var_list
         self.layers[layer.name] = layer
         if isinstance(neurons, b2.SpikeGeneratorGroup):
-            self.monitors[layer.name] = b2.SpikeMonitor(neurons)
-            self.add([neurons, self.monitors[layer.name]])
+            self.monitors[layer.name] = recording.spike_monitor(neurons)
+            monitors = [self.monitors[layer.name]]
             
         else:
-            self.monitors[layer.name] = [b2.StateMonitor(neurons, var_list, record=True),
-                                b2.SpikeMonitor(neurons)]
-            self.add([neurons, self.monitors[layer.name]])
-        self.store()
+            self.monitors[layer.name] = [recording.state_monitor(neurons, layer.var_list),
+                                         recording.spike_monitor(neurons)]
+            monitors = self.monitors[layer.name]
+        self.add([neurons] + [m for m in monitors if m is not None])
+        self._snapshot(layer.name, layer, neurons)
 
-    def add_connection(self, conn : object) -> None:
+    def add_connection(self, conn : object, recording : RecordingPolicy = None) -> None:
+        '''
+        Add a connection to the Network, with the state monitor described by
+        the recording policy. By default nothing is recorded.
+        '''
+        recording = recording or RecordingPolicy.off()
         self.connections[conn.name] = conn
-        if conn.var_list:
-            self.monitors[conn.name] = b2.StateMonitor(conn.synapses, conn.var_list, record = [0])
-            self.add(self.monitors[conn.name])
+        monitor = recording.state_monitor(conn.synapses, conn.var_list)
+        if monitor is not None:
+            self.monitors[conn.name] = monitor
+            self.add(monitor)
         self.add(conn.synapses)
-        self.store()
+        self._snapshot(conn.name, conn, conn.synapses)
         
     def describe(self):
         
@@ -74,41 +266,289 @@ class SNN(b2.Network):
         self.run(duration, report='text')
         # plot_connection_activity(self.connections[0], self.monitors['conn'])
 
-    def train(self, dataset, sim_duration):
-        '''Train the SNN
+    def run_samples(self, samples, sim_duration, rest = 0 * b2.ms, layer = None):
+        '''Run several samples back to back in a single simulation run.
+    
+        On a replicated network (see from_spec), consecutive samples are first
+        spread over the copies and only then placed back to back in time.
     
         Parameters
         ----------
-        dataset : torch Dataset
+        samples : list
+            (indices, times) input spike events of every sample, times being
+            relative to the start of the sample and indices to the input
+            neurons of a single copy. Spikes after sim_duration are dropped,
+            as a sample never runs past it.
+        sim_duration : brian2.Quantity
+            Simulated duration of each sample.
+        rest : brian2.Quantity
+            Resting gap added after each sample, spikes emitted during the gap
+            are not counted.
+            Packing samples in time or resting needs a spike monitor recording
+            spike times, a counts only monitor supports a single time slot.
+        layer : str
+            Name of the layer whose spikes are counted, defaults to the second
+            added layer.
+
+        Returns
+        -------
+        counts : np.array
+            Spike counts of shape (len(samples), number of neurons in layer).
+        '''
+        layer_names     = list(self.layers)
+        layer           = layer or layer_names[1]
+        input_neurons   = self.layers[layer_names[0]].neurons
+        n_inputs        = input_neurons.N // self.replicas
+        n_neurons       = self.layers[layer].neurons.N // self.replicas
+        n_slots         = -(-len(samples) // self.replicas)
+        spike_monitor   = self.monitors[layer][1]
+        dt              = self.layers[layer].neurons.clock.dt
+        sim_steps       = int(round(sim_duration / dt))
+        period_steps    = int(round((sim_duration + rest) / dt))
+        
+        if not spike_monitor.record and (n_slots > 1 or rest > 0 * b2.ms):
+            raise ValueError('Packed samples need spike times, layer {} only records spike counts'.format(layer))
+        
+        samples = [(np.asarray(idx)[times < sim_duration], times[times < sim_duration])
+                   for idx, times in samples]
+        t0 = self.t
+        offsets = t0 + np.arange(n_slots) * period_steps * dt
+        replica, slot = np.arange(len(samples)) % self.replicas, np.arange(len(samples)) // self.replicas
+        indices = np.concatenate([idx + r * n_inputs for (idx, _), r in zip(samples, replica)])
+        times = np.concatenate([np.asarray((times + offsets[k]) / b2.second)
+                                for (_, times), k in zip(samples, slot)])
+        with self._stage('set_spikes'):
+            input_layer = self.layers[layer_names[0]]
+            if hasattr(input_layer, 'set_events'):
+                input_layer.set_events(indices, times * b2.second)
+            else:
+                input_neurons.set_spikes(indices=indices, times=times * b2.second)
+        
+        first_spike = spike_monitor.num_spikes
+        count_before = spike_monitor.count[:].copy()
+        with self._stage('run'):
+            self.run(n_slots * period_steps * dt, profile = self.profiler is not None)
+        if self.profiler is not None:
+            self.profiler.add_run(self)
+            self.profiler.samples += len(samples)
+        if not spike_monitor.record or (n_slots == 1 and rest == 0 * b2.ms):
+            return (spike_monitor.count[:] - count_before).reshape(-1, n_neurons)[:len(samples)]
+        
+        with self._stage('count'):
+            steps = np.round(np.asarray((spike_monitor.t[first_spike:] - t0) / dt)).astype(int)
+            spike_replica, neuron_idx = np.divmod(spike_monitor.i[first_spike:], n_neurons)
+            sample = steps // period_steps * self.replicas + spike_replica
+            counted = steps % period_steps < sim_steps
+            counts = np.bincount(sample[counted] * n_neurons + neuron_idx[counted],
+                                 minlength=n_slots * self.replicas * n_neurons)
+        return counts.reshape(-1, n_neurons)[:len(samples)]
+
+    @staticmethod
+    def _as_events(dataset):
+        if isinstance(dataset, SpikeEventCache):
+            return dataset
+        if hasattr(dataset, 'spike_events'):
+            return dataset.spike_events()
+        return SpikeEventCache.from_dataset(dataset)
+    
+    def evaluate(self, dataset, sim_duration, workers = 1, layer = None, batch_size = None):
+        '''Run every sample independently and returns its spike counts.
+        
+        Every sample starts from the initial transient state (see reset_state)
+        and the network is restored after each sample, so it is meant for
+        networks without plasticity (e.g. Diehl_and_Cook_LIF in test mode).
+        The network is left as it was, snapshots taken with store() are kept.
+    
+        Parameters
+        ----------
+        dataset : torch Dataset, H5SpikeDataset or SpikeEventCache
+            Dataset iterator
+        sim_duration : brian2.Quantity
+            A duration time for simulation, forced to be a b2.Quantity instance.
+        workers : int
+            Number of processes. With more than one, the network is rebuilt
+            from its spec in each process, loaded with the current persistent
+            state and run on a shard of the dataset.
+        layer : str
+            Name of the layer whose spikes are counted, defaults to the second
+            added layer.
+        batch_size : int
+            Number of samples simulated in a single run by a network replicated
+            batch_size times (see from_spec), defaults to the replicas of this
+            network. Every copy starts from the initial transient state of
+            this network.
+
+        Returns
+        -------
+        counts : np.array
+            Spike counts of shape (number of samples, number of neurons in layer),
+            in dataset order.
+        '''
+        events = self._as_events(dataset)
+        batch_size = batch_size or self.replicas
+        if workers == 1 and batch_size == self.replicas:
+            return self._evaluate_events(events, sim_duration, layer)
+        if self.spec is None:
+            raise ValueError('Parallel or batched evaluation needs a network built with SNN.from_spec')
+        
+        state = self.get_persistent_state(initial = True)
+        if workers == 1:
+            return _evaluate_shard(self.spec, state, events, sim_duration, layer, batch_size)
+        bounds = np.linspace(0, len(events), 4 * workers + 1).astype(int)
+        shards = [events.shard(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            counts = pool.map(_evaluate_shard, repeat(self.spec), repeat(state), shards,
+                              repeat(sim_duration), repeat(layer), repeat(batch_size))
+            return np.concatenate(list(counts))
+    
+    def predict(self, dataset, sim_duration, **kwargs):
+        '''Predict the class of every sample from the neuron assignments
+        computed by train.
+    
+        Parameters
+        ----------
+        dataset : torch Dataset, H5SpikeDataset or SpikeEventCache
             Dataset iterator
         sim_duration : brian2.Quantity
             A duration time for simulation, forced to be a b2.Quantity instance.
+        kwargs :
+            workers and batch_size, passed to evaluate.
+
+        Returns
+        -------
+        predictions : np.array
+            Predicted class of every sample.
+        accuracy : float
+            Fraction of samples whose prediction matches the label.
+        '''
+        if self.assignments is None:
+            raise ValueError('Neurons must be assigned to classes by train before predicting')
+        events = self._as_events(dataset)
+        counts = self.evaluate(events, sim_duration, **kwargs)
+        predictions = self.classes[predict(counts, self.assignments, self.n_class)]
+        return predictions, accuracy(predictions, events.labels)
+    
+    def _evaluate_events(self, events, sim_duration, layer = None):
+        input_neurons   = list(self.layers.values())[0].neurons
+        channel_offset  = input_neurons.N // self.replicas - events.n_channels
+        counts          = []
+        # Named snapshots, the default one belongs to the caller
+        self.store('before_evaluate')
+        self.reset_state()
+        self.store('evaluate')
+        for first in range(0, len(events), self.replicas):
+            batch = range(first, min(first + self.replicas, len(events)))
+            samples = [(idx + channel_offset, times) for idx, times, _ in (events[k] for k in batch)]
+            counts.append(self.run_samples(samples, sim_duration, layer = layer))
+            self.restore('evaluate')
+        self.restore('before_evaluate')
+        return np.concatenate(counts)
+    
+    def train(self, dataset, sim_duration, pack = 1, rest = 0 * b2.ms, reset = 'state',
+              checkpoint_path = None, checkpoint_every = 1000, start = 0, profile = False,
+              recorder = None):
+        '''Train the SNN
+    
+        Parameters
+        ----------
+        dataset : torch Dataset, H5SpikeDataset or SpikeEventCache
+            Dataset iterator, converted once to spike events unless it is
+            already a SpikeEventCache. An H5SpikeDataset is read lazily and
+            converted sample by sample.
+        sim_duration : brian2.Quantity
+            A duration time for simulation, forced to be a b2.Quantity instance.
+        pack : int
+            Number of samples simulated back to back in a single run, the
+            network is only restored between packs.
+        rest : brian2.Quantity
+            Resting gap between two packed samples.
+        reset : str
+            'state' calls reset_state() between packs and keeps what has been
+            learned, 'restore' restores the network as it was before training.
+        checkpoint_path : str
+            Directory where a checkpoint is saved every checkpoint_every
+            samples and at the end of training.
+        checkpoint_every : int
+            Number of samples between two checkpoints.
+        start : int
+            Index of the first sample, e.g. the 'samples' entry of the manifest
+            returned by load_checkpoint to resume training.
+        profile : bool
+            Time every stage of the training loop and run brian2 with
+            profile=True. The timings are aggregated over samples in
+            self.training_profile, see Profiler.to_json and Profiler.to_csv.
+        recorder : MonitorRecorder
+            Spills the monitors to disk after every pack, so that memory does
+            not grow with the number of samples.
         '''
         print('\n##### Launching SNN Training #####\n')
         self.describe()
+        if recorder is not None and recorder.every is not None and (pack > 1 or rest > 0 * b2.ms):
+            raise ValueError('Packed or resting samples are counted from spike times, periodic drains would drop them')
+        # Only this training run is profiled, later runs go back to profile=False
+        self.profiler = Profiler() if profile else None
+        try:
+            if reset == 'restore':
+                self.store()
 
-        n_class                 = len(set(dataset.tensors[1].flatten().numpy()))
-        input_neurons           = list(self.layers.items())[0][1].neurons
-        hidden_neurons          = list(self.layers.items())[1][1].neurons
-        n_neurons               = hidden_neurons.N
-        spike_monitor           = self.monitors[list(self.layers.items())[1][0]][1]
-        assignment              = np.zeros(n_neurons)
-        label_wise_spike_record = np.zeros((n_class, n_neurons))
+            with self._stage('convert'):
+                events              = self._as_events(dataset)
+            input_neurons           = list(self.layers.items())[0][1].neurons
+            hidden_neurons          = list(self.layers.items())[1][1].neurons
+            n_neurons               = hidden_neurons.N // self.replicas
+            channel_offset          = input_neurons.N // self.replicas - events.n_channels
+            spike_record            = SpikeCountRecord(len(events), n_neurons, events.labels)
+            # Labels need not be 0..n_class - 1, neurons are assigned to class indices
+            self.classes            = np.unique(spike_record.labels)
+            self.n_class            = len(self.classes)
+            seen                    = start
         
-        with tqdm(total=len(dataset), desc='Training progress : ') as pbar:
-            for i, (x, y) in enumerate(dataset):
-                if i > 2:
-                    break
-                data, target = spike_train_to_times(x.numpy()), y.numpy()
-                indices = [input_neurons.N - 1 for i in range(len(data))]
-                input_neurons.set_spikes(indices=indices, times=data)
+            with tqdm(total=len(events), desc='Training progress : ') as pbar:
+                pbar.update(start)
+                for first in range(start, len(events), pack):
+                    batch = range(first, min(first + pack, len(events)))
+                    with self._stage('convert'):
+                        samples = [(idx + channel_offset, times) for idx, times, _ in (events[k] for k in batch)]
                 
-                self.run(sim_duration)
-                label_wise_spike_record[int(y)] = spike_monitor.count[:]
-            
-                # ADD LABEL RECORDING            
-                pbar.update()
-                self.restore()
-                            
-                            
-        print(label_wise_spike_record)
\ No newline at end of file
+                    counts = self.run_samples(samples, sim_duration, rest)
+                    with self._stage('record'):
+                        spike_record.record(first, counts)
+                    if recorder is not None:
+                        with self._stage('drain'):
+                            recorder.drain(first, batch.stop)
+                
+                    pbar.update(len(batch))
+                    seen = batch.stop
+                    with self._stage('reset'):
+                        if reset == 'restore':
+                            self.restore()
+                        else:
+                            self.reset_state()
+                    if checkpoint_path and seen // checkpoint_every > first // checkpoint_every:
+                        with self._stage('checkpoint'):
+                            self.save_checkpoint(checkpoint_path, samples = seen)
+        finally:
+            self.training_profile, self.profiler = self.profiler, None
+        
+        if checkpoint_path:
+            self.save_checkpoint(checkpoint_path, samples = seen)
+        
+        counts, labels = spike_record.counts[start:seen], spike_record.labels[start:seen]
+        targets = np.searchsorted(self.classes, labels)
+        self.assignments, self.label_wise_spike_record = assign_neurons(counts, targets, self.n_class)
+        print('Training accuracy : {:.4f}'.format(
+            accuracy(self.classes[predict(counts, self.assignments, self.n_class)], labels)))
+        return spike_record
+
+
+def _synapse_matrix(values, source, target, replicas):
+    '''Returns the synapses i, j of a persistent state as a sparse
+    connectivity between one copy of the source and target layers.'''
+    from scipy import sparse
+    shape = (source.neurons.N // replicas, target.neurons.N // replicas)
+    return sparse.coo_matrix((np.ones(len(values['i'])), (values['i'], values['j'])), shape = shape)
+
+
+def _evaluate_shard(spec, state, events, sim_duration, layer, replicas):
+    net = SNN.from_spec(spec, replicas, state)
+    return net._evaluate_events(events, sim_duration, layer)
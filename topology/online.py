@@ -0,0 +1,156 @@
+import asyncio
+import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import brian2 as b2
+import numpy as np
+
+
+class OnlineInference:
+    '''
+    Runs a trained SNN as a long-lived service over a live signal stream.
+    Every chunk of raw signal is encoded with a BSAEncoder stream, the spikes
+    are injected in the input layer at the current network time and the
+    network is advanced by the encoded duration, keeping one warm network for
+    the whole stream. Chunks are processed one at a time, in arrival order.
+
+    The network should keep the default RecordingPolicy.counts_only()
+    monitors, full spike monitors grow with the length of the stream.
+    '''
+    def __init__(self, net, encoder, layer : str = None, history : int = 10000):
+        '''
+        Parameters
+        ----------
+        net : SNN
+            Trained network, its first layer must be a ManualSpikeInput whose
+            dt is the sampling period of the signal in ms.
+        encoder : BSAEncoder
+            Encoder whose stream state is used for the signal.
+        layer : str
+            Name of the layer whose spikes are counted, defaults to the second
+            added layer.
+        history : int
+            Number of chunk latencies kept for latency_percentiles.
+        '''
+        if net.replicas != 1:
+            raise ValueError('Online inference runs a single copy of the network')
+        self.net            = net
+        self.encoder        = encoder
+        self.input_layer    = list(net.layers.values())[0]
+        self.layer          = layer or list(net.layers)[1]
+        self.monitor        = net.monitors[self.layer][1]
+        self.latencies      = deque(maxlen = history)
+        self.queue          = None
+        self._executor      = ThreadPoolExecutor(max_workers = 1)
+        self.encoder.reset_stream()
+
+    def process(self, chunk) -> np.array:
+        '''
+        Encode a chunk, run the network over the encoded spikes and returns
+        the spike counts of the layer during that window. The encoder lags the
+        signal by at most its filter length, so a window may be shorter than
+        the chunk, or empty.
+        '''
+        start = time.perf_counter()
+        spikes = self.encoder.encode_chunk(np.asarray(chunk, dtype = np.float64))
+        counts = np.zeros(len(self.monitor.count), dtype = int)
+        if len(spikes):
+            indices, times = self.input_layer.to_events(spikes)
+            before = self.monitor.count[:].copy()
+            self.input_layer.set_events(indices, times + self.net.t)
+            self.net.run(len(spikes) * self.input_layer.bin_dt * b2.ms)
+            counts = self.monitor.count[:] - before
+        self.latencies.append(time.perf_counter() - start)
+        return counts
+
+    def latency_percentiles(self, percentiles = (50, 90, 99)) -> dict:
+        '''Returns {percentile : latency in ms} over the last processed chunks.'''
+        if not self.latencies:
+            return {}
+        values = np.percentile(np.asarray(self.latencies) * 1e3, percentiles)
+        return dict(zip(percentiles, values))
+
+    async def submit(self, chunk) -> np.array:
+        '''In-process client, returns the spike counts of chunk once processed
+        by run_worker.'''
+        future = asyncio.get_running_loop().create_future()
+        await self._requests().put((chunk, future))
+        return await future
+
+    async def run_worker(self) -> None:
+        '''
+        Process the submitted chunks until cancelled. Network runs happen in a
+        dedicated thread so that the event loop keeps accepting chunks.
+        '''
+        loop = asyncio.get_running_loop()
+        queue = self._requests()
+        while True:
+            chunk, future = await queue.get()
+            try:
+                counts = await loop.run_in_executor(self._executor, self.process, chunk)
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                if not future.cancelled():
+                    future.set_result(counts)
+
+    async def serve(self, host : str = '127.0.0.1', port : int = 8765) -> None:
+        '''
+        Serve the stream on a local TCP socket until cancelled. A request is
+        the number of samples as a little endian uint32 followed by the
+        float64 samples, the reply is the number of neurons as a uint32
+        followed by the int32 spike counts (see OnlineClient).
+        '''
+        worker = asyncio.create_task(self.run_worker())
+        server = await asyncio.start_server(self._handle_client, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def _requests(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                (n_samples,) = struct.unpack('<I', await reader.readexactly(4))
+                chunk = np.frombuffer(await reader.readexactly(8 * n_samples), dtype = '<f8')
+                counts = await self.submit(chunk)
+                writer.write(struct.pack('<I', len(counts)) + counts.astype('<i4').tobytes())
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+
+class OnlineClient:
+    '''Socket client of OnlineInference.serve.'''
+    def __init__(self, reader, writer):
+        self.reader         = reader
+        self.writer         = writer
+
+    @classmethod
+    async def connect(cls, host : str = '127.0.0.1', port : int = 8765) -> 'OnlineClient':
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, chunk) -> np.array:
+        '''Send a chunk of signal and returns the spike counts of its window.'''
+        chunk = np.asarray(chunk, dtype = '<f8')
+        self.writer.write(struct.pack('<I', len(chunk)) + chunk.tobytes())
+        await self.writer.drain()
+        (n_neurons,) = struct.unpack('<I', await self.reader.readexactly(4))
+        return np.frombuffer(await self.reader.readexactly(4 * n_neurons), dtype = '<i4')
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
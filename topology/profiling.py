@@ -0,0 +1,66 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import brian2 as b2
+
+
+class Profiler:
+    '''
+    Accumulates the wall clock time spent in the Python stages of SNN.train
+    and the time brian2 spends in each code object over all runs.
+    '''
+    def __init__(self):
+        self.stages         = defaultdict(float)
+        self.calls          = defaultdict(int)
+        self.code_objects   = defaultdict(float)
+        self.samples        = 0
+    
+    @contextmanager
+    def stage(self, name : str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+            self.calls[name] += 1
+    
+    def add_run(self, net : b2.Network) -> None:
+        '''
+        Add the code object timings of the last run of net, brian2 only keeps
+        them for the last run made with profile=True.
+        '''
+        for name, duration in net.profiling_info:
+            self.code_objects[name] += float(duration / b2.second)
+    
+    def top(self, n : int = 10) -> list:
+        '''Returns the n code objects with the largest total time.'''
+        return sorted(self.code_objects.items(), key = lambda item: item[1], reverse = True)[:n]
+    
+    def report(self, n : int = 10) -> dict:
+        samples = max(self.samples, 1)
+        simulated = sum(self.code_objects.values()) or 1.
+        return {
+            'samples' : self.samples,
+            'stages' : {name : {'total_s' : total, 'calls' : self.calls[name],
+                                'per_sample_s' : total / samples}
+                        for name, total in self.stages.items()},
+            'code_objects' : [{'name' : name, 'total_s' : total, 'fraction' : total / simulated}
+                              for name, total in self.top(n)]
+        }
+    
+    def to_json(self, path : str, n : int = 10) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.report(n), f, indent = 2)
+    
+    def to_csv(self, path : str, n : int = 10) -> None:
+        report = self.report(n)
+        with open(path, 'w', newline = '') as f:
+            writer = csv.writer(f)
+            writer.writerow(['kind', 'name', 'total_s', 'calls', 'per_sample_s'])
+            for name, stage in report['stages'].items():
+                writer.writerow(['stage', name, stage['total_s'], stage['calls'], stage['per_sample_s']])
+            for code_object in report['code_objects']:
+                writer.writerow(['code_object', code_object['name'], code_object['total_s'], '',
+                                 code_object['total_s'] / max(self.samples, 1)])
@@ -0,0 +1,122 @@
+import brian2 as b2
+import numpy as np
+
+
+class MonitorRecorder:
+    '''
+    Spills the spikes and state traces held by the monitors of an SNN to a
+    chunked, compressed HDF5 file and clears the monitors, so that memory
+    stays flat however long the network is trained or run.
+
+    Drain k owns the spikes offsets[k]:offsets[k + 1] of '<name>/spikes/i'
+    and '<name>/spikes/t', and the rows offsets[k]:offsets[k + 1] of
+    '<name>/state/t' and '<name>/state/<variable>' (times, neurons), in SI
+    units. '/samples' holds the [first, stop) samples simulated before each
+    drain (-1 for periodic drains) and '/time' the network time in seconds.
+    Ring buffered and count only monitors are already bounded and skipped.
+    '''
+    def __init__(self, net, path : str, every = None, compression : str = 'gzip'):
+        '''
+        Parameters
+        ----------
+        net : SNN
+            Network whose monitors are recorded
+        path : str
+            Path of the HDF5 file, overwritten
+        every : brian2.Quantity
+            Also drain the monitors every that much simulated time, from a
+            NetworkOperation, for long runs without sample boundaries. Create
+            the recorder before net.store() since it adds an object to net.
+            Samples are then counted from spike counts, SNN.train rejects
+            packing and rest, which need spike times.
+        compression : str
+            h5py compression filter of the datasets
+        '''
+        import h5py
+        self.net            = net
+        self.every          = every
+        self.compression    = compression
+        self.file           = h5py.File(path, 'w')
+        self.spike_monitors = {}
+        self.state_monitors = {}
+        self.operation      = None
+
+        for name, monitors in net.monitors.items():
+            for monitor in monitors if isinstance(monitors, list) else [monitors]:
+                if isinstance(monitor, b2.SpikeMonitor) and monitor.record:
+                    self.spike_monitors[name] = monitor
+                    self._create(name + '/spikes/i', (), np.int32)
+                    self._create(name + '/spikes/t', (), np.float64)
+                    self._create_offsets(name + '/spikes/offsets')
+                elif isinstance(monitor, b2.StateMonitor):
+                    self.state_monitors[name] = monitor
+                    self._create(name + '/state/t', (), np.float64)
+                    for var in monitor.record_variables:
+                        dataset = self._create(name + '/state/' + var, (len(monitor.record),), np.float64)
+                        dataset.attrs['unit'] = str(b2.get_unit(monitor.source.variables[var].dim))
+                    self._create_offsets(name + '/state/offsets')
+        self._create('samples', (2,), np.int64)
+        self._create('time', (), np.float64)
+
+        if every is not None:
+            self.operation = b2.NetworkOperation(lambda: self.drain(), dt = every, when = 'end')
+            net.add(self.operation)
+
+    def drain(self, first : int = -1, stop : int = -1) -> None:
+        '''
+        Append the content of every monitor to the file and clear them.
+        Spike counts are kept.
+
+        Parameters
+        ----------
+        first, stop : int
+            Samples simulated since the last drain
+        '''
+        for name, monitor in self.spike_monitors.items():
+            group = name + '/spikes/'
+            self._append(group + 'i', np.asarray(monitor.i[:], dtype = np.int32))
+            self._append(group + 't', np.asarray(monitor.t_[:]))
+            self._append(group + 'offsets', [self.file[group + 'i'].shape[0]])
+            # EventMonitor.resize leaves the number of events to the caller
+            monitor.resize(0)
+            monitor.variables['N'].set_value(0)
+
+        for name, monitor in self.state_monitors.items():
+            group = name + '/state/'
+            self._append(group + 't', np.asarray(monitor.t_[:]))
+            for var in monitor.record_variables:
+                self._append(group + var, np.asarray(getattr(monitor, var + '_')).T)
+            self._append(group + 'offsets', [self.file[group + 't'].shape[0]])
+            monitor.resize(0)
+
+        self._append('samples', [[first, stop]])
+        self._append('time', [float(self.net.t_)])
+
+    def close(self) -> None:
+        '''Drain what is left in the monitors and close the file.'''
+        if self.operation is not None:
+            self.net.remove(self.operation)
+            self.operation = None
+        if self.file:
+            self.drain()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _create(self, key, shape, dtype):
+        return self.file.create_dataset(key, shape = (0,) + shape, maxshape = (None,) + shape,
+                                        dtype = dtype, chunks = True, compression = self.compression)
+
+    def _create_offsets(self, key):
+        self.file.create_dataset(key, data = np.zeros(1, dtype = np.int64), maxshape = (None,),
+                                 chunks = True)
+
+    def _append(self, key, values):
+        dataset = self.file[key]
+        size = dataset.shape[0]
+        dataset.resize(size + len(values), axis = 0)
+        dataset[size:] = values
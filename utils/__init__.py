@@ -1,2 +1,3 @@
 from .plot import *
-from .input import *
\ No newline at end of file
+from .input import *
+from .dataset import *
\ No newline at end of file
@@ -0,0 +1,216 @@
+import brian2 as b2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .input import SpikeEventCache, spike_train_to_events
+
+
+class H5SpikeDataset:
+    '''
+    Encoded spike trains read lazily from an HDF5 file.
+    
+    The file stays open and samples are read by contiguous chunks, the next
+    chunks being read ahead in a background thread while the current one is
+    used. Only a few chunks are kept in memory, labels are read on their own.
+    '''
+    def __init__(self, path : str, x_key : str = 'x', y_key : str = 'y',
+                 chunk_size : int = 256, read_ahead : int = 1):
+        '''
+        Parameters
+        ----------
+        path : str
+            Path of the HDF5 file
+        x_key : str
+            Dataset of spike trains, shaped (samples, time) or
+            (samples, channels, time)
+        y_key : str
+            Dataset of labels
+        chunk_size : int
+            Number of samples read at once
+        read_ahead : int
+            Number of chunks read in advance
+        '''
+        self.path           = path
+        import h5py
+        self.file           = h5py.File(path, 'r')
+        self.x              = self.file[x_key]
+        self.y_key          = y_key
+        self.chunk_size     = chunk_size
+        self.read_ahead     = read_ahead
+        self._labels        = None
+        self._chunks        = {}
+        self._reader        = ThreadPoolExecutor(max_workers = 1)
+    
+    @property
+    def labels(self) -> np.array:
+        if self._labels is None:
+            self._labels = self.file[self.y_key][:].reshape(len(self))
+        return self._labels
+    
+    @property
+    def n_channels(self) -> int:
+        return 1 if self.x.ndim == 2 else self.x.shape[1]
+    
+    def read(self, start : int, stop : int) -> np.array:
+        '''Read samples start to stop in a single contiguous access.'''
+        return self.x[start:stop]
+    
+    def _chunk(self, c):
+        for ahead in range(c, min(c + self.read_ahead + 1, self._n_chunks())):
+            if ahead not in self._chunks:
+                start = ahead * self.chunk_size
+                self._chunks[ahead] = self._reader.submit(self.read, start, start + self.chunk_size)
+        for old in [k for k in self._chunks if k < c or k > c + self.read_ahead]:
+            del self._chunks[old]
+        return self._chunks[c].result()
+    
+    def _n_chunks(self):
+        return -(-len(self) // self.chunk_size)
+    
+    def __len__(self):
+        return self.x.shape[0]
+    
+    def __getitem__(self, k):
+        '''Returns the (spike train, label) of sample k.'''
+        return self._chunk(k // self.chunk_size)[k % self.chunk_size], self.labels[k]
+    
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+    
+    def spike_events(self, unit = b2.ms, dt = 1):
+        '''Serve samples as spike events, converted when they are read.'''
+        return SpikeEventView(self, unit, dt)
+    
+    def close(self):
+        self._reader.shutdown()
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+
+class SpikeEventView:
+    '''
+    Serves the samples of an indexable dataset as (indices, times, label)
+    events like a SpikeEventCache, converting each sample when it is read
+    instead of converting the whole dataset up front.
+    '''
+    def __init__(self, dataset, unit = b2.ms, dt = 1):
+        self.dataset        = dataset
+        self.labels         = dataset.labels
+        self.n_channels     = dataset.n_channels
+        self.unit           = unit
+        self.dt             = dt
+    
+    def shard(self, start, stop):
+        '''Returns a SpikeEventCache of samples start to stop, read at once.'''
+        return SpikeEventCache.from_arrays(self.dataset.read(start, stop), self.labels[start:stop],
+                                           self.unit, self.dt)
+    
+    def __len__(self):
+        return len(self.dataset)
+    
+    def __getitem__(self, k):
+        x, y = self.dataset[k]
+        indices, times = spike_train_to_events(x, self.unit, self.dt)
+        return indices, times, y
+
+
+class SparseSpikeWriter:
+    '''
+    Writes encoded spike trains to HDF5 as spike events instead of dense 0/1
+    arrays. Sample k owns the spikes offsets[k]:offsets[k + 1] of the flat
+    'times' (time bin) and 'indices' (channel) datasets, labels go to 'y'.
+    '''
+    def __init__(self, path : str, dt = 1, compression : str = 'gzip'):
+        '''
+        Parameters
+        ----------
+        path : str
+            Path of the HDF5 file, overwritten
+        dt : float
+            Duration of a time bin, in the unit used when reading
+        compression : str
+            h5py compression filter of the event datasets
+        '''
+        import h5py
+        self.file = h5py.File(path, 'w')
+        self.file.attrs['dt'] = dt
+        self.file.attrs['n_channels'] = 1
+        for key, dtype in [('times', np.int32), ('indices', np.int32), ('y', np.float64)]:
+            self.file.create_dataset(key, shape = (0,), maxshape = (None,), dtype = dtype,
+                                     chunks = True, compression = compression)
+        self.file.create_dataset('offsets', data = np.zeros(1, dtype = np.int64),
+                                 maxshape = (None,), chunks = True)
+    
+    def write(self, spikes : np.array, labels) -> None:
+        '''
+        Append samples.
+        
+        Parameters
+        ----------
+        spikes : np.array
+            Output of BSAEncoder.encode (one sample), of BSAEncoder.encode_many
+            (samples, time) or a (samples, channels, time) array
+        labels : float or np.array
+            Label of every sample
+        '''
+        if spikes.ndim == 1:
+            spikes = spikes[np.newaxis, :]
+        events = SpikeEventCache.from_arrays(spikes, np.atleast_1d(labels))
+        self.file.attrs['n_channels'] = events.n_channels
+        offset = self.file['offsets'][-1]
+        self._append('times', events.times.astype(np.int32))
+        self._append('indices', events.indices)
+        self._append('y', events.labels)
+        self._append('offsets', events.offsets[1:] + offset)
+    
+    def _append(self, key, values):
+        dataset = self.file[key]
+        size = dataset.shape[0]
+        dataset.resize((size + len(values),))
+        dataset[size:] = values
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+
+class SparseSpikeDataset(SpikeEventCache):
+    '''
+    Reads spike events written by SparseSpikeWriter without densifying them.
+    Offsets and labels are loaded, spike times and indices are read from the
+    file for each sample unless in_memory is set.
+    '''
+    def __init__(self, path : str, unit = b2.ms, in_memory : bool = False):
+        import h5py
+        self.file = h5py.File(path, 'r')
+        indices, times = self.file['indices'], self.file['times']
+        if in_memory:
+            indices, times = indices[:], times[:]
+        super().__init__(indices, times, self.file['offsets'][:], self.file['y'][:],
+                         int(self.file.attrs['n_channels']), unit)
+        self.dt = float(self.file.attrs['dt'])
+    
+    def shard(self, start, stop):
+        '''Returns an in memory SpikeEventCache of samples start to stop.'''
+        first, last = self.offsets[start], self.offsets[stop]
+        return SpikeEventCache(self.indices[first:last], self.times[first:last] * self.dt,
+                               self.offsets[start:stop + 1] - first, self.labels[start:stop],
+                               self.n_channels, self.unit)
+    
+    def __getitem__(self, k):
+        '''Returns the (indices, times, label) of sample k.'''
+        start, stop = self.offsets[k], self.offsets[k + 1]
+        return self.indices[start:stop], self.times[start:stop] * self.dt * self.unit, self.labels[k]
+    
+    def close(self):
+        self.file.close()
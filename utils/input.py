@@ -1,8 +1,5 @@
 import brian2 as b2
 import numpy as np
-from elephant.spike_train_generation import homogeneous_poisson_process
-from elephant.statistics import instantaneous_rate
-from quantities import Hz, s, ms
 
 def get_step_current(t_start, t_end, unit_time, current_unit, amplitude, append_zero=False):
     tmp_size = 1 + t_end
@@ -19,16 +16,131 @@ def spike_train_to_times(spike_trains, unit = b2.ms, dt = 1):
     
     Parameters
     ----------
-    x : np.array
-        One sampled spike train
+    spike_trains : np.array
+        One sampled spike train, see spike_train_to_events for several
+        channels
     '''
-    times = [idx * dt for idx, i in enumerate(spike_trains) if i == 1]
+    spike_trains = np.asarray(spike_trains)
+    if spike_trains.ndim > 1:
+        raise ValueError('spike_train_to_times takes a single spike train, use spike_train_to_events for {} arrays'.format(
+            spike_trains.shape))
+    times = np.flatnonzero(spike_trains == 1) * dt
     return times * unit
 
 
+def spike_train_to_events(spike_trains, unit = b2.ms, dt = 1):
+    '''Take one or several spike trains and returns (indices, times) events
+    sorted by time then channel, as expected by a SpikeGeneratorGroup.
+    
+    Parameters
+    ----------
+    spike_trains : np.array
+        One sampled spike train, or a (channels, time) array with one spike
+        train per channel. A single spike train is given channel 0.
+    '''
+    spike_trains = np.asarray(spike_trains)
+    if spike_trains.ndim == 1:
+        bins = np.flatnonzero(spike_trains == 1)
+        indices = np.zeros(len(bins), dtype=np.int32)
+    else:
+        bins, indices = np.nonzero(spike_trains.T == 1)
+        indices = indices.astype(np.int32)
+    return indices, bins * dt * unit
+
+
+def _to_numpy(x):
+    return x.numpy() if hasattr(x, 'numpy') else np.asarray(x)
+
+
+class SpikeEventCache:
+    '''Spike events of a whole dataset, converted once and served per sample.
+    
+    Events of every sample are stored back to back in flat ``indices`` and
+    ``times`` arrays, sample ``k`` spanning ``offsets[k]:offsets[k + 1]``.
+    Times are stored as plain floats in ``unit``.
+    '''
+    def __init__(self, indices, times, offsets, labels, n_channels = 1, unit = b2.ms):
+        self.indices        = indices
+        self.times          = times
+        self.offsets        = offsets
+        self.labels         = labels
+        self.n_channels     = n_channels
+        self.unit           = unit
+    
+    @classmethod
+    def from_arrays(cls, x, y, unit = b2.ms, dt = 1):
+        '''Convert a (samples, time) or (samples, channels, time) spike array.
+        
+        Parameters
+        ----------
+        x : np.array
+            Spike trains of every sample
+        y : np.array
+            Label of every sample
+        '''
+        x = _to_numpy(x)
+        if x.ndim == 2:
+            samples, bins = np.nonzero(x == 1)
+            indices = np.zeros(len(bins), dtype=np.int32)
+            n_channels = 1
+        else:
+            samples, bins, indices = np.nonzero(x.transpose(0, 2, 1) == 1)
+            indices = indices.astype(np.int32)
+            n_channels = x.shape[1]
+        offsets = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(samples, minlength=len(x)), out=offsets[1:])
+        return cls(indices, bins * float(dt), offsets, _to_numpy(y).reshape(len(x)),
+                   n_channels, unit)
+    
+    @classmethod
+    def from_dataset(cls, dataset, unit = b2.ms, dt = 1):
+        '''Convert every (x, y) sample of a dataset.
+        
+        Parameters
+        ----------
+        dataset : iterable
+            Dataset yielding (spike train, label) pairs, a torch TensorDataset
+            is converted in a single pass over its tensors.
+        '''
+        if hasattr(dataset, 'tensors'):
+            return cls.from_arrays(dataset.tensors[0], dataset.tensors[1], unit, dt)
+        # seeded so that an empty dataset gives an empty cache, offsets = [0]
+        indices = [np.zeros(0, dtype=np.int32)]
+        times, counts, labels = [np.zeros(0)], [0], []
+        n_channels = 1
+        for x, y in dataset:
+            x = _to_numpy(x)
+            if x.ndim > 1:
+                n_channels = x.shape[0]
+            idx, t = spike_train_to_events(x, unit = 1, dt = float(dt))
+            indices.append(idx)
+            times.append(t)
+            counts.append(len(t))
+            labels.append(_to_numpy(y).item())
+        return cls(np.concatenate(indices), np.concatenate(times),
+                   np.cumsum(counts), np.asarray(labels), n_channels, unit)
+    
+    def shard(self, start, stop):
+        '''Returns a SpikeEventCache holding samples start to stop.'''
+        first, last = self.offsets[start], self.offsets[stop]
+        return SpikeEventCache(self.indices[first:last], self.times[first:last],
+                               self.offsets[start:stop + 1] - first, self.labels[start:stop],
+                               self.n_channels, self.unit)
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, k):
+        '''Returns the (indices, times, label) of sample k.'''
+        start, stop = self.offsets[k], self.offsets[k + 1]
+        return self.indices[start:stop], self.times[start:stop] * self.unit, self.labels[k]
+
+
 def random_spike_train(rate, start, end):
+    from elephant.spike_train_generation import homogeneous_poisson_process
     return homogeneous_poisson_process(rate=rate, t_start=start, t_stop=end)
 
 def get_average_spike_rate(spike_train, unit):
+    from elephant.statistics import instantaneous_rate
     return np.mean(instantaneous_rate(spike_train, unit))
     
\ No newline at end of file
@@ -1,76 +1,168 @@
 import brian2 as b2
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-sns.set_style('dark')
-
-def plot_all(S):
-    t = S.t / b2.ms
-    for i in range(len(S.v)):
-        v = S.v[i] / b2.mV
-        plt.ion()
-        plt.figure(figsize=(15,7))
-        plt.suptitle('State variables for neuron : {}'.format(i))
-        plt.subplot(211)
-        plt.plot(t, v, color = u'#d84a37', label='Membrane potential')
-        plt.legend(loc=1)
-        plt.xlim(0, t[-1])
-        plt.xlabel("t [ms]")
-        plt.ylabel("v [mV]")
-        plt.ioff()
-    plt.show()
-    
-def plot_state_variables(S, layer_name, neuron_id = 0):
-    
-    t = S.t / b2.ms
-    v = S.v[neuron_id] / b2.mV
-    
-    plt.ion()
-    plt.figure(figsize=(15,7))
-    plt.suptitle('State variables for neuron layer : {}'.format(layer_name))
-    plt.subplot(211)
-    plt.plot(t, v, color = u'#d84a37', label='Membrane potential')
-    plt.legend(loc=1)
-    plt.xlim(0, t[-1])
-    plt.xlabel("t [ms]")
-    plt.ylabel("v [mV]")
-    plt.ioff()
-    plt.show()
-    
-    
-def plot_spiking_activity(S, layer_name):
-    t = S.t / b2.ms
-    N = len(list(set(S.all_values()['t'])))
-    plt.ion()
-    plt.figure(figsize=(15,7))
-    plt.suptitle('Spiking activity on layer : {}'.format(layer_name))
-    plt.plot(t, S.i, '.', label='Spike')
-    plt.legend(loc=1)
-    plt.xlim(0, t[-1])
-    plt.ylim(-1, N + 1)
-    plt.xlabel('t [ms]')
-    plt.ylabel('Neuron index')
-    plt.grid()
-    plt.ioff()
-    plt.show()
-
-def plot_stdp_activity(connection, monitor):
-    plt.subplot(311)
+import numpy as np
+
+_plt = None
+
+
+def _pyplot():
+    '''Import matplotlib and seaborn on first use, so that headless runs
+    never pay for them.'''
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        sns.set_style('dark')
+        _plt = plt
+    return _plt
+
+
+def _figure(path, figsize = (15,7)):
+    '''
+    Returns a new figure. Figures written to a file are created without
+    pyplot, on the Agg canvas, so that no window or GUI backend is needed.
+    '''
+    if path is None:
+        return _pyplot().figure(figsize=figsize)
+    _pyplot()
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _finish(fig, path, dpi = 150):
+    if path is None:
+        _pyplot().show()
+    else:
+        fig.savefig(path, dpi=dpi)
+
+
+def _state_values(S, var):
+    '''Recorded values of var, shaped (neurons, times), of a StateMonitor or
+    RingStateMonitor.'''
+    return getattr(S, var) if isinstance(S, b2.StateMonitor) else S.get(var)
+
+
+def minmax_decimate(t, y, n_bins = 2000):
+    '''
+    Downsample traces to the minimum and maximum of n_bins time bins, which
+    keeps every peak of the trace once drawn.
+
+    Parameters
+    ----------
+    t : np.array
+        Sample times, shaped (times,)
+    y : np.array
+        One trace or several traces shaped (traces, times)
+    n_bins : int
+        Number of bins, at most 2 * n_bins samples are kept per trace
+
+    Returns
+    -------
+    t, y : np.array
+        Decimated times and values, both shaped (traces, samples)
+    '''
+    t, y = np.asarray(t), np.atleast_2d(np.asarray(y))
+    n_traces, n_samples = y.shape
+    if n_samples <= 2 * n_bins:
+        return np.broadcast_to(t, y.shape), y
+
+    size = -(-n_samples // n_bins)
+    blocks = np.pad(y, ((0, 0), (0, size * n_bins - n_samples)), mode='edge')
+    blocks = blocks.reshape(n_traces, n_bins, size)
+    idx = np.sort(np.stack([blocks.argmin(axis=2), blocks.argmax(axis=2)], axis=2), axis=2)
+    idx = np.minimum(idx + (np.arange(n_bins) * size)[:, np.newaxis], n_samples - 1)
+    idx = idx.reshape(n_traces, -1)
+    return t[idx], np.take_along_axis(y, idx, axis=1)
+
+
+def _plot_traces(ax, t, y, n_bins, **kwargs):
+    '''Draw decimated traces as a single rasterized LineCollection.'''
+    from matplotlib.collections import LineCollection
+    t, y = minmax_decimate(t, y, n_bins)
+    ax.add_collection(LineCollection(np.stack([t, y], axis=2), rasterized=True, **kwargs))
+    ax.autoscale()
+
+
+def plot_all(S, neurons = None, n_bins = 2000, path = None):
+    '''
+    Membrane potential of many neurons in a single figure.
+
+    Parameters
+    ----------
+    S : brian2.StateMonitor
+        Monitor recording v
+    neurons : np.array
+        Indices (in the recorded neurons) of the plotted neurons, all if None
+    n_bins : int
+        Traces are decimated to 2 * n_bins samples
+    path : str
+        Image file the figure is written to, shown interactively if None
+    '''
+    t = np.asarray(S.t / b2.ms)
+    v = np.asarray(_state_values(S, 'v') / b2.mV)
+    if neurons is not None:
+        v = v[neurons]
+    fig = _figure(path)
+    fig.suptitle('Membrane potential of {} neurons'.format(len(v)))
+    ax = fig.add_subplot(111)
+    _plot_traces(ax, t, v, n_bins, linewidths=0.5, alpha=0.5)
+    ax.set_xlim(0, t[-1])
+    ax.set_xlabel("t [ms]")
+    ax.set_ylabel("v [mV]")
+    _finish(fig, path)
+
+def plot_state_variables(S, layer_name, neuron_id = 0, n_bins = 2000, path = None):
+
+    t = np.asarray(S.t / b2.ms)
+    v = np.asarray(_state_values(S, 'v')[neuron_id] / b2.mV)
+    t, v = minmax_decimate(t, v, n_bins)
+
+    fig = _figure(path)
+    fig.suptitle('State variables for neuron layer : {}'.format(layer_name))
+    ax = fig.add_subplot(211)
+    ax.plot(t[0], v[0], color = u'#d84a37', label='Membrane potential')
+    ax.legend(loc=1)
+    ax.set_xlim(0, t[0, -1])
+    ax.set_xlabel("t [ms]")
+    ax.set_ylabel("v [mV]")
+    _finish(fig, path)
+
+
+def plot_spiking_activity(S, layer_name, path = None):
+    '''Spike raster of a SpikeMonitor, rasterized so that millions of spikes
+    stay cheap to draw and to save.'''
+    t = np.asarray(S.t / b2.ms)
+    N = S.source.N
+    fig = _figure(path)
+    fig.suptitle('Spiking activity on layer : {}'.format(layer_name))
+    ax = fig.add_subplot(111)
+    ax.scatter(t, np.asarray(S.i), s=1, marker='.', linewidths=0, label='Spike', rasterized=True)
+    ax.legend(loc=1)
+    if len(t):
+        ax.set_xlim(0, t[-1])
+    ax.set_ylim(-1, N + 1)
+    ax.set_xlabel('t [ms]')
+    ax.set_ylabel('Neuron index')
+    ax.grid()
+    _finish(fig, path)
+
+def plot_stdp_activity(connection, monitor, n_bins = 2000, path = None):
     gmax = connection.parameters['gmax']
-    S = connection.synapses
-    plt.ion()
-    plt.plot(S.w / gmax, '.k')
-    plt.ylabel('Weight / gmax')
-    plt.xlabel('Synapse index')
-    
-    plt.subplot(312)
-    plt.hist(S.w / gmax, 20)
-    plt.xlabel('Weight / gmax')
-    
-    plt.subplot(313)
-    plt.plot(monitor.t/ b2.second, monitor.w.T/gmax)
-    plt.xlabel('Time (s)')
-    plt.ylabel('Weight / gmax')
-    plt.tight_layout()
-    plt.ioff()
-    plt.show()
\ No newline at end of file
+    w = np.asarray(connection.synapses.w / gmax)
+    fig = _figure(path)
+
+    ax = fig.add_subplot(311)
+    ax.plot(w, '.k', rasterized=True)
+    ax.set_ylabel('Weight / gmax')
+    ax.set_xlabel('Synapse index')
+
+    ax = fig.add_subplot(312)
+    ax.hist(w, 20)
+    ax.set_xlabel('Weight / gmax')
+
+    ax = fig.add_subplot(313)
+    _plot_traces(ax, np.asarray(monitor.t / b2.second), np.asarray(_state_values(monitor, 'w')) / gmax,
+                 n_bins, linewidths=0.5)
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Weight / gmax')
+    fig.tight_layout()
+    _finish(fig, path)
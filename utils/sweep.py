@@ -0,0 +1,113 @@
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import signal
+from topology.layers.encoder import BSAEncoder
+
+DEFAULTS = {'width' : 51, 'std' : 7, 'filter_amp' : 0.2, 'step' : 1, 'threshold' : 3}
+TYPES = {'width' : int, 'std' : float, 'filter_amp' : float, 'step' : int, 'threshold' : float}
+
+
+def parameter_grid(grid : dict) -> list:
+    '''Expand {name : list of values} into the list of every combination.'''
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def normalize(params : dict) -> dict:
+    '''Complete params with the encoder defaults, as plain Python numbers
+    (grids built with np.arange hold numpy scalars), so that equivalent
+    configurations share a cache key.'''
+    return {name : TYPES[name](value) for name, value in dict(DEFAULTS, **params).items()}
+
+
+def _data_hash(signals):
+    digest = hashlib.sha256(str((signals.shape, signals.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(signals).data)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, params, data_hash):
+    key = hashlib.sha256((json.dumps(params, sort_keys = True) + data_hash).encode()).hexdigest()
+    return os.path.join(cache_dir, key + '.json')
+
+
+def score_bsa(params : dict, signals : np.array) -> dict:
+    '''
+    Encode and decode signals with one BSAEncoder configuration.
+    
+    Parameters
+    ----------
+    params : dict
+        Any of 'width' and 'std' (gaussian filter response), 'filter_amp',
+        'step' and 'threshold', missing ones take the encoder defaults.
+    signals : np.array
+        Signals of shape (n_signals, n_samples)
+
+    Returns
+    -------
+    result : dict
+        params with the mean RMSE, mean SNR (dB) and spike density.
+    '''
+    params = normalize(params)
+    encoder = BSAEncoder(filter_response = signal.windows.gaussian(params['width'], params['std']),
+                         step = params['step'], filter_amp = params['filter_amp'],
+                         threshold = params['threshold'])
+    spikes = encoder.encode_many(signals)
+    rmse, snr = encoder.reconstruction_error(signals, encoder.decode_many(spikes))
+    return dict(params, rmse = float(np.mean(rmse)), snr = float(np.mean(snr)),
+                spike_density = float(np.mean(spikes)))
+
+
+def _score_single_threaded(params, signals):
+    # Processes already use every core, numba threads would oversubscribe them
+    import numba
+    numba.set_num_threads(1)
+    return score_bsa(params, signals)
+
+
+def sweep_bsa(grid : dict, signals : np.array, workers : int = None,
+              cache_dir : str = '.bsa_sweep_cache') -> list:
+    '''
+    Score every BSAEncoder configuration of a parameter grid on a set of
+    signals, in a process pool. Results are cached on disk under a key made
+    of the parameters and a hash of the signals, so that reruns and refined
+    grids only compute new configurations.
+    
+    Parameters
+    ----------
+    grid : dict
+        {parameter name : list of values}, see score_bsa for the names
+    signals : np.array
+        Signals of shape (n_signals, n_samples)
+    workers : int
+        Number of processes, all cores by default
+    cache_dir : str
+        Directory of the cached results
+
+    Returns
+    -------
+    results : list
+        Result of every configuration (see score_bsa), sorted by RMSE.
+    '''
+    os.makedirs(cache_dir, exist_ok = True)
+    data_hash = _data_hash(signals)
+    results, missing = [], []
+    for params in map(normalize, parameter_grid(grid)):
+        path = _cache_path(cache_dir, params, data_hash)
+        if os.path.exists(path):
+            with open(path) as f:
+                results.append(json.load(f))
+        else:
+            missing.append(params)
+    
+    if missing:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            for params, result in zip(missing, pool.map(_score_single_threaded, missing,
+                                                         itertools.repeat(signals))):
+                with open(_cache_path(cache_dir, params, data_hash), 'w') as f:
+                    json.dump(result, f)
+                results.append(result)
+    return sorted(results, key = lambda result: result['rmse'])